@@ -19,7 +19,7 @@ __version__ = "1.0.0-alpha.1"
 
 # TODO:
 #  - dest should keep user specified "mode", "UID", "GID", except with --force
-#  - Support formats: deb, rpm, whl, gz, xz, bz2
+#  - Support formats: whl
 #  - Allow user to select file type to use
 #  - Provides packages: WHL, DEB, RPM, chocolatey, Inno setup, exe zip
 #  - Vendor dependencies if not packaged.
@@ -55,10 +55,13 @@ __version__ = "1.0.0-alpha.1"
 #  - git: Parse ".gitmodules" and retrieve submodules
 
 from nun._ui import set_ui
+from nun._wrk import set_workers
 from nun._tsk import Tsk as _Tsk
 
 
-def download(resources, output=".", debug=False, force=False):
+def download(
+    resources, output=".", debug=False, force=False, paranoid=False, cache=True
+):
     """
     Download resources.
 
@@ -67,13 +70,32 @@ def download(resources, output=".", debug=False, force=False):
         output (path-like object): Output path.
         debug (bool): If True, show full error traceback and stop on first error.
         force (bool): Replace any existing destination even if modified by user.
+        paranoid (bool): Always hash existing destinations to detect user changes,
+            instead of trusting their stat attributes.
+        cache (bool): Use the downloaded artifacts cache.
     """
-    with _Tsk(resources, "download", output=output, debug=debug, force=force) as tsk:
+    with _Tsk(
+        resources,
+        "download",
+        output=output,
+        debug=debug,
+        force=force,
+        paranoid=paranoid,
+        cache=cache,
+    ) as tsk:
         tsk.apply()
 
 
 def extract(
-    resources, output=".", debug=False, trusted=False, strip_components=0, force=False
+    resources,
+    output=".",
+    debug=False,
+    trusted=False,
+    strip_components=0,
+    force=False,
+    paranoid=False,
+    include=None,
+    cache=True,
 ):
     """
     Extract resources.
@@ -88,6 +110,11 @@ def extract(
         strip_components (int): strip NUMBER leading components from file path on
             extraction.
         force (bool): Replace any existing destination even if modified by user.
+        paranoid (bool): Always hash existing destinations to detect user changes,
+            instead of trusting their stat attributes.
+        include (iterable of str): Extract only files matching one of these glob
+            patterns. Remote zip archives members are then fetched selectively.
+        cache (bool): Use the downloaded artifacts cache.
     """
     with _Tsk(
         resources,
@@ -95,13 +122,16 @@ def extract(
         output=output,
         debug=debug,
         force=force,
+        paranoid=paranoid,
+        cache=cache,
         trusted=trusted,
         strip_components=strip_components,
+        include=include,
     ) as tsk:
         tsk.apply()
 
 
-def install(resources, debug=False, force=False):
+def install(resources, debug=False, force=False, paranoid=False, cache=True):
     """
     Install resources.
 
@@ -109,8 +139,18 @@ def install(resources, debug=False, force=False):
         resources (iterable of str): Resources URLs.
         debug (bool): If True, show full error traceback and stop on first error.
         force (bool): Replace any existing destination even if modified by user.
+        paranoid (bool): Always hash existing destinations to detect user changes,
+            instead of trusting their stat attributes.
+        cache (bool): Use the downloaded artifacts cache.
     """
-    with _Tsk(resources, "install", debug=debug, force=force) as tsk:
+    with _Tsk(
+        resources,
+        "install",
+        debug=debug,
+        force=force,
+        paranoid=paranoid,
+        cache=cache,
+    ) as tsk:
         tsk.apply()
 
 
@@ -126,7 +166,7 @@ def remove(resources="*", debug=False):
         tsk.apply()
 
 
-def update(resources="*", debug=False, force=False):
+def update(resources="*", debug=False, force=False, paranoid=False, cache=True):
     """
     Update resources.
 
@@ -134,6 +174,16 @@ def update(resources="*", debug=False, force=False):
         resources (iterable of str): Resources URLs.
         debug (bool): If True, show full error traceback and stop on first error.
         force (bool): Replace any existing destination even if modified by user.
+        paranoid (bool): Always hash existing destinations to detect user changes,
+            instead of trusting their stat attributes.
+        cache (bool): Use the downloaded artifacts cache.
     """
-    with _Tsk(resources, "update", debug=debug, force=force) as tsk:
+    with _Tsk(
+        resources,
+        "update",
+        debug=debug,
+        force=force,
+        paranoid=paranoid,
+        cache=cache,
+    ) as tsk:
         tsk.apply()
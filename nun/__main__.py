@@ -24,6 +24,39 @@ def _run_command():
         action="store_true",
         help="If True, show full error traceback and stop on " "first error.",
     )
+    parser.add_argument(
+        "--net-workers",
+        type=int,
+        metavar="NUMBER",
+        help="Number of threads performing network requests and streamed "
+        "extraction.",
+    )
+    parser.add_argument(
+        "--disk-workers",
+        type=int,
+        metavar="NUMBER",
+        help="Number of threads writing files.",
+    )
+    parser.add_argument(
+        "--cpu-workers",
+        type=int,
+        metavar="NUMBER",
+        help="Number of threads extracting members of zip archives that cannot "
+        "be streamed. Other archives and compressed files are decompressed by the "
+        "network threads.",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        metavar="NUMBER",
+        help="Maximum number of connections in parallel to a same download host.",
+    )
+    parser.add_argument(
+        "--api-connections",
+        type=int,
+        metavar="NUMBER",
+        help="Maximum number of connections in parallel to a same platform API.",
+    )
 
     # Parser: "nun download"
     # TODO: Autocomplete resource_id from platforms
@@ -36,6 +69,17 @@ def _run_command():
     action.add_argument(
         "--force", "-f", help="Always replace destination.", action="store_true"
     )
+    action.add_argument(
+        "--paranoid",
+        help="Always hash existing files to detect changes.",
+        action="store_true",
+    )
+    action.add_argument(
+        "--no-cache",
+        dest="cache",
+        help="Do not use the downloaded files cache.",
+        action="store_false",
+    )
 
     # Parser: "nun extract"
     description = "Extract archives."
@@ -58,6 +102,25 @@ def _run_command():
     action.add_argument(
         "--force", "-f", help="Always replace destination.", action="store_true"
     )
+    action.add_argument(
+        "--paranoid",
+        help="Always hash existing files to detect changes.",
+        action="store_true",
+    )
+    action.add_argument(
+        "--include",
+        "-i",
+        action="append",
+        metavar="PATTERN",
+        help="Extract only files matching this glob pattern. Can be specified "
+        "multiple times.",
+    )
+    action.add_argument(
+        "--no-cache",
+        dest="cache",
+        help="Do not use the downloaded files cache.",
+        action="store_false",
+    )
 
     # Parser: "nun install"
     description = "Install packages."
@@ -70,6 +133,17 @@ def _run_command():
     description = "Update packages."
     action = sub_parsers.add_parser("update", help=description, description=description)
     action.add_argument("resources", nargs="*", help="Resources.", default="*")
+    action.add_argument(
+        "--paranoid",
+        help="Always hash existing files to detect changes.",
+        action="store_true",
+    )
+    action.add_argument(
+        "--no-cache",
+        dest="cache",
+        help="Do not use the downloaded files cache.",
+        action="store_false",
+    )
 
     # Parser: "nun remove"
     # TODO: Autocomplete resource from tracked
@@ -94,6 +168,13 @@ def _run_command():
     parser_action = args.pop("parser_action")
     if not parser_action:
         parser.error("An action is required")
+    workers = dict(
+        net=args.pop("net_workers"),
+        disk=args.pop("disk_workers"),
+        cpu=args.pop("cpu_workers"),
+        connections=args.pop("connections"),
+        api_connections=args.pop("api_connections"),
+    )
 
     try:
         from os.path import dirname, realpath
@@ -104,6 +185,7 @@ def _run_command():
         import nun
 
         nun.set_ui("cli")
+        nun.set_workers(**workers)
         getattr(nun, parser_action)(**args)
 
     except KeyboardInterrupt:  # pragma: no cover
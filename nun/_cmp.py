@@ -0,0 +1,184 @@
+"""Compression"""
+from bz2 import BZ2Decompressor
+from lzma import LZMADecompressor, FORMAT_ALONE
+from zlib import MAX_WBITS
+
+from nun._dst import BUFFER_SIZE
+
+# Gzip: Use Intel ISA-L if available, it is faster than zlib
+try:
+    from isal.isal_zlib import decompressobj as _gzip_decompressobj
+except ImportError:
+    from zlib import decompressobj as _gzip_decompressobj
+
+# Zstandard: Use standard library if available (Python >= 3.14), or any of the
+# common Zstandard libraries
+try:
+    from compression.zstd import ZstdDecompressor as _zstd_decompressor
+except ImportError:
+    try:
+        from pyzstd import ZstdDecompressor as _zstd_decompressor
+    except ImportError:
+        try:
+            from zstandard import ZstdDecompressor as _ZstandardDecompressor
+        except ImportError:
+            _zstd_decompressor = None
+        else:
+
+            def _zstd_decompressor():
+                """
+                Zstandard decompressor.
+
+                Returns:
+                    zstandard.ZstdDecompressionObj: Decompressor.
+                """
+                return _ZstandardDecompressor().decompressobj()
+
+
+#: Decompressors factories per compression format
+DECOMPRESSORS = {
+    "gz": lambda: _gzip_decompressobj(MAX_WBITS | 16),
+    "bz2": BZ2Decompressor,
+    "xz": LZMADecompressor,
+    "lzma": lambda: LZMADecompressor(FORMAT_ALONE),
+}
+if _zstd_decompressor is not None:
+    DECOMPRESSORS["zst"] = _zstd_decompressor
+
+# Compression formats magic numbers
+_MAGICS = (
+    (b"\x1f\x8b", "gz"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zst"),
+)
+_MAGIC_SIZE = max(len(magic) for magic, _ in _MAGICS)
+
+
+def detect_compression(header):
+    """
+    Detect the compression format of a content.
+
+    Args:
+        header (bytes): Start of the content.
+
+    Returns:
+        str or None: Compression format, None if not compressed with a known format.
+    """
+    for magic, compression in _MAGICS:
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def decompress_stream(fileobj):
+    """
+    Get a decompressed stream of a content, detecting its compression format.
+
+    Args:
+        fileobj (file-like object): Content, possibly compressed.
+
+    Returns:
+        nun._cmp.Decompressed: Decompressed content.
+    """
+    header = b""
+    while len(header) < _MAGIC_SIZE:
+        chunk = fileobj.read(_MAGIC_SIZE - len(header))
+        if not chunk:
+            break
+        header += chunk
+    return Decompressed(fileobj, detect_compression(header), header)
+
+
+class Decompressed:
+    """
+    Decompressed stream.
+
+    Concatenated compressed streams are decompressed as a single stream.
+
+    Args:
+        fileobj (file-like object): Compressed content.
+        compression (str or None): Compression format, None if not compressed.
+        header (bytes): Content already read from the file object.
+    """
+
+    __slots__ = (
+        "_read",
+        "_buffer",
+        "_compression",
+        "_decompressor",
+        "_streams",
+        "_eof",
+    )
+
+    def __init__(self, fileobj, compression, header=b""):
+        if compression is not None and compression not in DECOMPRESSORS:
+            raise NotImplementedError(
+                f'Support for the "{compression}" compression format requires to '
+                "install an optional dependency."
+            )
+
+        self._read = fileobj.read
+        self._buffer = header
+        self._compression = compression
+        self._decompressor = None
+        self._streams = 0
+        self._eof = False
+
+    def read(self, size=-1):
+        """
+        Read decompressed content.
+
+        Args:
+            size (int): Size to read from the compressed content. The size of
+                returned data vary.
+
+        Returns:
+            bytes: Decompressed data, empty when the end of the content is reached.
+        """
+        if size == -1:
+            size = BUFFER_SIZE
+
+        while not self._eof:
+            if self._buffer:
+                data = self._buffer
+                self._buffer = b""
+            else:
+                data = self._read(size)
+
+            if not data:
+                self._eof = True
+                if self._decompressor is not None:
+                    raise EOFError("Compressed content ended before the end of stream.")
+                break
+
+            elif self._compression is None:
+                return data
+
+            decompressor = self._decompressor
+            if decompressor is None:
+                # Ignore trailing data that is not another compressed stream
+                if self._streams and detect_compression(data) != self._compression:
+                    self._eof = True
+                    break
+
+                self._decompressor = decompressor = DECOMPRESSORS[self._compression]()
+                self._streams += 1
+            data = decompressor.decompress(data)
+
+            # End of a compressed stream, another stream may follow
+            if decompressor.eof:
+                self._buffer = decompressor.unused_data
+                self._decompressor = None
+
+            if data:
+                return data
+
+        return b""
+
+    def close(self):
+        """
+        Stop reading.
+        """
+        self._eof = True
+        self._buffer = b""
@@ -1,9 +1,12 @@
 """Database"""
 
+from concurrent.futures import Future
 from contextlib import contextmanager
 from json import dumps
 from os.path import join
+from queue import SimpleQueue, Empty
 from sqlite3 import connect, Row
+from threading import local, Lock, Thread
 from time import time
 
 from nun._cfg import DATA_DIR, APP_NAME
@@ -40,6 +43,8 @@ _TABLES = {
         ("revision", "TEXT"),
         # Size of the remote source
         ("size", "INTEGER"),
+        # Duration of the latest action on the source, in seconds
+        ("duration", "FLOAT"),
     ),
     # Destinations
     "dst": (
@@ -60,6 +65,8 @@ _TABLES = {
         ("st_size", "INTEGER"),
         ("st_mtime", "INTEGER"),
         ("st_ctime", "INTEGER"),
+        ("st_ino", "INTEGER"),
+        ("st_dev", "INTEGER"),
     ),
 }
 
@@ -79,11 +86,77 @@ def _list_columns():
 
 _COLUMNS = _list_columns()
 
+# Indexes definition: table, columns, unique
+_INDEXES = {
+    "dst_path": ("dst", ("path",), True),
+    "dst_src_id": ("dst", ("src_id",), False),
+    "dst_res_id": ("dst", ("res_id",), False),
+    "src_res_id_name": ("src", ("res_id", "name"), False),
+    "res_name": ("res", ("name",), False),
+}
+
+
+def _sql_create_index(name):
+    """
+    Create a CREATE INDEX query.
+
+    Args:
+        name (str): Index name.
+
+    Returns:
+        str: sql.
+    """
+    table, columns, unique = _INDEXES[name]
+    return (
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {name} '
+        f'ON {table}({", ".join(columns)})'
+    )
+
+
+# Database migrations, items are SQL queries to upgrade the database from the
+# version of the item index to the next version ("PRAGMA user_version").
+# A new database is directly created at the latest version.
+_MIGRATIONS = (
+    # 0 -> 1: Indexes
+    (
+        # Remove duplicated destinations before enforcing unique path
+        "DELETE FROM dst WHERE id NOT IN (SELECT MAX(id) FROM dst GROUP BY path)",
+        _sql_create_index("dst_path"),
+        _sql_create_index("dst_src_id"),
+        _sql_create_index("src_res_id_name"),
+        _sql_create_index("res_name"),
+    ),
+    # 1 -> 2: Destinations by resources index
+    (_sql_create_index("dst_res_id"),),
+    # 2 -> 3: Destinations inode and device
+    (
+        "ALTER TABLE dst ADD COLUMN st_ino INTEGER",
+        "ALTER TABLE dst ADD COLUMN st_dev INTEGER",
+    ),
+    # 3 -> 4: Sources actions duration
+    ("ALTER TABLE src ADD COLUMN duration FLOAT",),
+)
+
+# Connections settings
+_BUSY_TIMEOUT = 30000  # ms
+_CACHED_STATEMENTS = 256
+_PRAGMAS = (
+    # Readers does not block writer and writer does not block readers
+    "PRAGMA journal_mode=WAL",
+    # In WAL mode, "NORMAL" is safe from corruption and avoid "fsync" on commit
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={_BUSY_TIMEOUT}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Maximum number of write operations grouped in a same transaction
+_WRITER_BATCH = 512
+
 
 class _Database:
     """Application database"""
 
-    __slots__ = ("_path", "_sql_cache")
+    __slots__ = ("_path", "_sql_cache", "_local", "_connexions", "_lock", "_queue")
 
     def __init__(self):
         self._path = join(DATA_DIR, f"{APP_NAME}.sqlite")
@@ -91,31 +164,237 @@ class _Database:
         # Cached SQL queries
         self._sql_cache = {}
 
-        # Ensure tables exists
+        # Connexions, one per thread
+        self._local = local()
+        self._connexions = []
+        self._lock = Lock()
+
+        # Writer thread queue
+        self._queue = None
+
+        # Ensure tables exists and are up to date
+        self._migrate()
+
+    def _migrate(self):
+        """
+        Create the database or upgrade it to the latest version.
+        """
+        version = len(_MIGRATIONS)
         with self._cursor() as cursor:
-            for table, columns in _TABLES.items():
-                cursor.execute(
-                    f"CREATE TABLE IF NOT EXISTS {table}"
-                    f'({", ".join(" ".join(column) for column in columns)})'
+            # Lock the database to ensure migration is performed only once
+            cursor.execute("BEGIN IMMEDIATE")
+            current = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if current == version:
+                return
+
+            elif current > version:
+                raise RuntimeError(
+                    f'Database "{self._path}" was created by a newer version of '
+                    f"{APP_NAME}."
                 )
 
+            # New database: Create tables and indexes
+            if not cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table'"
+            ).fetchone():
+                for table, columns in _TABLES.items():
+                    cursor.execute(
+                        f"CREATE TABLE {table}"
+                        f'({", ".join(" ".join(column) for column in columns)})'
+                    )
+                for name in _INDEXES:
+                    cursor.execute(_sql_create_index(name))
+
+            # Existing database: Apply migrations
+            else:
+                for queries in _MIGRATIONS[current:]:
+                    for sql in queries:
+                        cursor.execute(sql)
+
+            cursor.execute(f"PRAGMA user_version = {version}")
+
+    def _connexion(self):
+        """
+        Database connexion of the current thread.
+
+        The connexion is created on first call in each thread, then kept open and
+        reused for all next queries of this thread.
+
+        Returns:
+            sqlite3.Connection: Database connexion.
+        """
+        try:
+            return self._local.connexion
+        except AttributeError:
+            pass
+
+        # "check_same_thread" is disabled to allow "close" from any thread, but
+        # the connexion is only used by the thread that created it.
+        connexion = connect(
+            self._path,
+            timeout=_BUSY_TIMEOUT / 1000,
+            cached_statements=_CACHED_STATEMENTS,
+            check_same_thread=False,
+        )
+        connexion.row_factory = Row
+        for pragma in _PRAGMAS:
+            connexion.execute(pragma)
+
+        with self._lock:
+            self._connexions.append(connexion)
+        self._local.connexion = connexion
+        self._local.depth = 0
+        return connexion
+
     @contextmanager
     def _cursor(self):
         """
         Database cursor.
 
+        A transaction is started by the outermost cursor and committed on its exit,
+        nested cursors of the same thread run in this transaction.
+
         Returns:
             sqlite3.Cursor: Database cursor.
         """
-        connexion = connect(self._path)
+        connexion = self._connexion()
+        thread_local = self._local
+        cursor = connexion.cursor()
+        thread_local.depth += 1
         try:
-            connexion.row_factory = Row
-            with connexion:
-                yield connexion.cursor()
-
+            # Nested cursor: Run in the parent cursor transaction
+            if thread_local.depth > 1:
+                yield cursor
+
+            # Run in a new transaction
+            else:
+                with connexion:
+                    yield cursor
         finally:
+            thread_local.depth -= 1
+            cursor.close()
+
+    def close(self):
+        """
+        Close all database connexions.
+
+        Connexions are automatically re-opened on next query.
+        """
+        with self._lock:
+            connexions = self._connexions
+            self._connexions = []
+            self._local = local()
+
+        for connexion in connexions:
             connexion.close()
 
+    @contextmanager
+    def writer(self):
+        """
+        Run write operations performed with "submit" in a dedicated writer thread.
+
+        Operations are queued and grouped in transactions by the writer thread, this
+        avoid lock contention between threads and reduce the number of commits.
+        Pending operations are all committed on exit.
+        """
+        if self._queue is not None:
+            # Writer already started
+            yield
+            return
+
+        self._queue = queue = SimpleQueue()
+        thread = Thread(
+            target=self._write, args=(queue,), name=f"{APP_NAME}-db", daemon=True
+        )
+        thread.start()
+        try:
+            yield
+        finally:
+            # No operation can be queued after the stop marker
+            with self._lock:
+                self._queue = None
+                queue.put(None)
+            thread.join()
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Perform a write operation, in the writer thread if started.
+
+        Args:
+            method (str): Write method name (For instance: "set_src", "del_dst").
+            args: Method positional arguments.
+            kwargs: Method keyword arguments.
+
+        Returns:
+            concurrent.futures.Future: Future of the method result.
+        """
+        future = Future()
+        operation = (future, method, args, kwargs)
+        with self._lock:
+            queue = self._queue
+            if queue is not None:
+                queue.put(operation)
+                return future
+        self._run(operation)
+        return future
+
+    def _write(self, queue):
+        """
+        Writer thread loop.
+
+        Args:
+            queue (queue.SimpleQueue): Operations queue, None to stop.
+        """
+        get = queue.get
+        get_nowait = queue.get_nowait
+        run = self._run
+        stop = False
+
+        while not stop:
+            # Get a batch of operations
+            operations = [get()]
+            add_operation = operations.append
+            while len(operations) < _WRITER_BATCH:
+                try:
+                    add_operation(get_nowait())
+                except Empty:
+                    break
+            if operations[-1] is None:
+                operations.pop()
+                stop = True
+
+            # Run all operations in a single transaction
+            results = []
+            add_result = results.append
+            try:
+                with self._cursor():
+                    for _, method, args, kwargs in operations:
+                        add_result(getattr(self, method)(*args, **kwargs))
+
+            # Transaction rolled back: Run operations one by one to isolate errors
+            except Exception:
+                for operation in operations:
+                    run(operation)
+
+            else:
+                for operation, result in zip(operations, results):
+                    operation[0].set_result(result)
+
+    def _run(self, operation):
+        """
+        Run a write operation in its own transaction.
+
+        Args:
+            operation (tuple): future, method name, arguments, keyword arguments.
+        """
+        future, method, args, kwargs = operation
+        try:
+            result = getattr(self, method)(*args, **kwargs)
+        except Exception as exception:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
     def get_dst(self, dst_path):
         """
         Get destination information.
@@ -144,6 +423,23 @@ class _Database:
             cursor.execute("SELECT * FROM dst WHERE src_id=?", (src_id,))
             return cursor.fetchall()
 
+    def get_dst_by_res(self, res_id):
+        """
+        Get all destination information for a same resource.
+
+        Args:
+            res_id (int): Resource ID.
+
+        Returns:
+            list of sqlite3.Row: destinations information.
+        """
+        if res_id is None:
+            return []
+
+        with self._cursor() as cursor:
+            cursor.execute("SELECT * FROM dst WHERE res_id=?", (res_id,))
+            return cursor.fetchall()
+
     def get_src(self, res_id, src_name):
         """
         Get source information.
@@ -246,6 +542,7 @@ class _Database:
         name=None,
         revision=None,
         size=None,
+        duration=None,
         ref_values=None,
     ):
         """
@@ -258,6 +555,7 @@ class _Database:
             name (str): Source name.
             revision (str): File revision.
             size (int): File size
+            duration (float): Action duration in seconds.
             ref_values (sqlite3.Row): Previous row values.
 
         Returns:
@@ -272,6 +570,7 @@ class _Database:
             name=name,
             revision=revision,
             size=size,
+            duration=duration,
         )
 
     def set_dst(
@@ -279,6 +578,7 @@ class _Database:
         tsk_id,
         res_id=None,
         src_id=None,
+        dst_id=None,
         path=None,
         digest=None,
         st_mode=None,
@@ -287,6 +587,8 @@ class _Database:
         st_size=None,
         st_mtime=None,
         st_ctime=None,
+        st_ino=None,
+        st_dev=None,
         ref_values=None,
     ):
         """
@@ -296,6 +598,7 @@ class _Database:
             tsk_id (int): Task ID.
             res_id (int): Resource ID.
             src_id (int): Source ID.
+            dst_id (int): Destination ID. Perform update if specified, else insert.
             path (str): Path.
             digest (str): Digest.
             st_mode (int): mode
@@ -304,6 +607,8 @@ class _Database:
             st_size (int): Size
             st_mtime (int): Modification time.
             st_ctime (int): Creation time.
+            st_ino (int): Inode number.
+            st_dev (int): Device ID.
             ref_values (sqlite3.Row): Previous row values.
 
         Returns:
@@ -311,7 +616,7 @@ class _Database:
         """
         return self._sql_insert_or_update(
             "dst",
-            src_id,
+            dst_id,
             ref_values,
             tsk_id=tsk_id,
             res_id=res_id,
@@ -324,8 +629,88 @@ class _Database:
             st_size=st_size,
             st_mtime=st_mtime,
             st_ctime=st_ctime,
+            st_ino=st_ino,
+            st_dev=st_dev,
         )
 
+    def set_src_dsts(
+        self,
+        tsk_id,
+        dsts,
+        res_id=None,
+        src_id=None,
+        name=None,
+        revision=None,
+        size=None,
+        duration=None,
+        ref_values=None,
+    ):
+        """
+        Insert or update a source and its destinations in a single transaction.
+
+        Args:
+            tsk_id (int): Task ID.
+            dsts (iterable of dict): Destinations values, with the same keys as
+                "set_dst" arguments, except "tsk_id", "res_id", "src_id" and
+                "dst_id".
+            res_id (int): Resource ID.
+            src_id (int): Source ID. Perform update if specified, else insert.
+            name (str): Source name.
+            revision (str): File revision.
+            size (int): File size
+            duration (float): Action duration in seconds.
+            ref_values (sqlite3.Row): Previous source row values.
+
+        Returns:
+            tuple: Source ID, dict of destinations IDs per path.
+        """
+        with self._cursor() as cursor:
+            src_id = self.set_src(
+                tsk_id,
+                res_id=res_id,
+                src_id=src_id,
+                name=name,
+                revision=revision,
+                size=size,
+                duration=duration,
+                ref_values=ref_values,
+            )
+
+            # Split rows to INSERT and rows to UPDATE
+            inserts = []
+            updates = []
+            paths = []
+            add_insert = inserts.append
+            add_update = updates.append
+            add_path = paths.append
+            cols = _COLUMNS["dst"]
+            for values in dsts:
+                values = values.copy()
+                dst_ref_values = values.pop("ref_values", None)
+                values.update(tsk_id=tsk_id, res_id=res_id, src_id=src_id)
+                add_path(values["path"])
+                if dst_ref_values is None:
+                    add_insert(tuple(values[col] for col in cols))
+                else:
+                    values["row_id"] = dst_ref_values["id"]
+                    add_update(values)
+
+            # Another source of the task may have created the same path first, the
+            # latest source written to this path becomes its owner
+            if inserts:
+                cursor.executemany(self._sql_upsert_query("dst", "path"), inserts)
+            if updates:
+                cursor.executemany(self._sql_update_query("dst", cols), updates)
+
+            # Get destinations IDs
+            dst_ids = dict()
+            if paths:
+                cursor.execute("SELECT id, path FROM dst WHERE src_id = ?", (src_id,))
+                for row in cursor.fetchall():
+                    dst_ids[row["path"]] = row["id"]
+
+            return src_id, {path: dst_ids[path] for path in paths}
+
     def del_res(self, res_id):
         """
         Delete a resource from the database.
@@ -399,28 +784,36 @@ class _Database:
             row_id = ref_values["id"]
 
         # Define values to update
-        elif ref_values is None:
-            ref_values = dict()
-
-        get_value = ref_values.get
+        get_value = dict(ref_values).get if ref_values is not None else dict().get
         parameters = {
             key: value
             for key, value in values.items()
             if value is not None and value != get_value(key)
         }
 
-        # Write query
-        cols = tuple(sorted(parameters))
+        parameters["row_id"] = row_id
+        return self._sql_update_query(table, tuple(parameters)), parameters
+
+    def _sql_update_query(self, table, cols):
+        """
+        Get an UPDATE query to update a row by its ID.
+
+        Args:
+            table (str): Table.
+            cols (tuple of str): Columns to update.
+
+        Returns:
+            str: sql, with ":row_id" and ":<column>" parameters.
+        """
+        cols = tuple(sorted(col for col in cols if col != "row_id"))
         try:
-            sql = self._sql_cache[(table, cols)]
+            return self._sql_cache[(table, cols)]
         except KeyError:
             values = ", ".join(f"{col} = :{col}" for col in cols)
             sql = self._sql_cache[
                 (table, cols)
             ] = f"UPDATE {table} SET {values} WHERE id = :row_id"
-
-        parameters["row_id"] = row_id
-        return sql, parameters
+            return sql
 
     def _sql_insert(self, table, **values):
         """
@@ -433,15 +826,54 @@ class _Database:
         Returns:
             tuple: sql str, parameters tuple.
         """
-        cols = _COLUMNS[table]
+        return (
+            self._sql_insert_query(table),
+            tuple(values[col] for col in _COLUMNS[table]),
+        )
+
+    def _sql_insert_query(self, table):
+        """
+        Get an INSERT query.
+
+        Args:
+            table (str): Table.
+
+        Returns:
+            str: sql, with parameters ordered like table columns.
+        """
         try:
-            sql = self._sql_cache[table]
+            return self._sql_cache[table]
         except KeyError:
-            self._sql_cache[table] = sql = (
+            cols = _COLUMNS[table]
+            sql = self._sql_cache[table] = (
                 f'INSERT INTO {table}({",".join(cols)}) '
                 f'VALUES ({",".join("?" * len(cols))})'
             )
-        return sql, tuple(values[col] for col in cols)
+            return sql
+
+    def _sql_upsert_query(self, table, key):
+        """
+        Get an INSERT query that updates the existing row instead if its unique key
+        value already exists.
+
+        Args:
+            table (str): Table.
+            key (str): Column with an unique index.
+
+        Returns:
+            str: sql, with parameters ordered like table columns.
+        """
+        try:
+            return self._sql_cache[(table, key)]
+        except KeyError:
+            values = ", ".join(
+                f"{col} = excluded.{col}" for col in _COLUMNS[table] if col != key
+            )
+            sql = self._sql_cache[(table, key)] = (
+                f"{self._sql_insert_query(table)} "
+                f"ON CONFLICT({key}) DO UPDATE SET {values}"
+            )
+            return sql
 
 
 # Use a single database instance
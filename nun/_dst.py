@@ -2,18 +2,44 @@
 Destination
 """
 from hashlib import blake2b
+from io import BytesIO
+from json import dump, load
 from os import rename, utime, remove, readlink, makedirs, symlink, fsencode, lstat
-from os.path import exists, isdir
+from os.path import exists, isdir, getsize, dirname
 from shutil import copystat
 from time import time
 
 from nun.exceptions import CancelException
-from nun._db import DB
 from nun._cfg import APP_NAME
 
 BUFFER_SIZE = 65536
+
+# Maximum size of new file content buffered in memory before being written on disk
+SPOOL_SIZE = 1048576
 _PRT_EXT = f".prt.{APP_NAME}"
 _BAK_EXT = f".bak.{APP_NAME}"
+_RSM_EXT = f".rsm.{APP_NAME}"
+
+# Stat attributes that must be unchanged to trust the digest from the database
+_STAT_KEYS = ("st_mode", "st_size", "st_mtime", "st_ctime", "st_ino", "st_dev")
+
+
+def _hash_file(path, hash_obj):
+    """
+    Update a hash with a local file content.
+
+    Args:
+        path (path-like object): File path.
+        hash_obj (hashlib.blake2b): Hash object to update.
+    """
+    update_hash = hash_obj.update
+    with open(path, "rb") as file:
+        read = file.read
+        while True:
+            chunk = read(BUFFER_SIZE)
+            if not chunk:
+                break
+            update_hash(chunk)
 
 
 def remove_existing(path):
@@ -35,9 +61,15 @@ class Dst:
 
     Args:
         path (str): Destination path.
+        res_id (int): Resource ID.
+        db_info (sqlite3.Row): Destination information from the database, None if
+            not in the database.
         mtime (int or float): Modification time.
         force (bool): Replace destination if exists and modified by user.
         dst_type (str): Type of destination ("file", "dir", "link").
+        paranoid (bool): If True, always hash the current destination content to
+            detect changes. Else, the digest from the database is trusted if the
+            destination stat attributes are unchanged.
     """
 
     __slots__ = (
@@ -54,21 +86,35 @@ class Dst:
         "_file_obj",
         "_type",
         "_db_info",
+        "_paranoid",
+        "_spooled",
+        "_resume",
+        "_allocated",
     )
 
-    def __init__(self, path, res_id, mtime=None, force=False, dst_type="file"):
+    def __init__(
+        self,
+        path,
+        res_id,
+        db_info=None,
+        mtime=None,
+        force=False,
+        dst_type="file",
+        paranoid=False,
+    ):
         # TODO:
-        #  - Use SpooledTemporaryFile and freeze it on drive
-        #    when self._update is True
         #  - Set ".part.nun" mode to 600
 
-        self._db_info = DB.get_dst(path)
+        self._db_info = db_info
 
         self._path = path
         self._path_part = None
         self._path_bak = None
         self._file_obj = None
         self._type = dst_type
+        self._paranoid = paranoid
+        self._resume = None
+        self._allocated = False
 
         self._hash_cur = None
         self._hash_new = None
@@ -102,8 +148,13 @@ class Dst:
         if dst_type != "dir":
             self._path_part = self._path + _PRT_EXT
 
+        # New file content is buffered in memory and only written to disk if
+        # an update is required or if too large
         if dst_type == "file":
-            self._file_obj = open(self._path_part, "wb")
+            self._file_obj = BytesIO()
+            self._spooled = True
+        else:
+            self._spooled = False
 
         self._hash_obj = blake2b()
 
@@ -114,6 +165,12 @@ class Dst:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        # Keep partially written content to allow resuming if interrupted
+        if exc_type is not None and self._resume and not self._spooled:
+            if self._file_obj is not None:
+                self._file_obj.close()
+                self._file_obj = None
+            self._path_part = None
         self.cancel()
 
     @property
@@ -126,24 +183,38 @@ class Dst:
         """
         return self._path
 
-    def db_update(self, tsk_id, res_id, src_id):
+    @property
+    def digest(self):
         """
-        Update the destination in the database.
+        Digest of the new content.
 
-        Args:
-            tsk_id (int): Task ID.
-            res_id (int): Resource ID.
-            src_id (int): Srouce ID.
+        Returns:
+            str or None: Digest, None if the destination is not closed.
+        """
+        return self._hash_new
+
+    @property
+    def db_id(self):
+        """
+        Destination ID in the database.
 
         Returns:
-            int: Destination ID.
+            int or None: Destination ID, None if not in the database.
+        """
+        if self._db_info is not None:
+            return self._db_info["id"]
+
+    def db_values(self):
+        """
+        Destination values to update in the database.
+
+        Returns:
+            dict or None: "nun._db.DB.set_dst" keyword arguments, None if the
+                destination is already up to date in the database.
         """
         if self._update or self._db_info is None:
             stat = lstat(self._path)
-            return DB.set_dst(
-                tsk_id=tsk_id,
-                res_id=res_id,
-                src_id=src_id,
+            return dict(
                 path=self._path,
                 digest=self._hash_new,
                 st_mode=stat.st_mode,
@@ -152,11 +223,13 @@ class Dst:
                 st_size=stat.st_size,
                 st_mtime=stat.st_mtime,
                 st_ctime=stat.st_ctime,
+                st_ino=stat.st_ino,
+                st_dev=stat.st_dev,
                 ref_values=self._db_info,
             )
 
         # Already up to date
-        return self._db_info["id"]
+        return None
 
     def _check_current(self):
         """
@@ -169,6 +242,10 @@ class Dst:
             if self._type == "dir":
                 self._hash_cur = "0" if isdir(self._path) else ""
 
+            elif self._stat_unchanged():
+                # Trust the digest from the database
+                self._hash_cur = self._hash_old
+
             elif self._type == "link":
                 try:
                     data = fsencode(readlink(self.path))
@@ -179,13 +256,8 @@ class Dst:
                     self._hash_cur = ""
             else:
                 try:
-                    with open(self._path, "rb") as file:
-                        h = blake2b()
-                        while True:
-                            chunk = file.read(BUFFER_SIZE)
-                            if not chunk:
-                                break
-                            h.update(chunk)
+                    h = blake2b()
+                    _hash_file(self._path, h)
                     self._hash_cur = h.hexdigest()
 
                 except FileNotFoundError:
@@ -193,6 +265,27 @@ class Dst:
 
         return self._hash_cur
 
+    def _stat_unchanged(self):
+        """
+        Check if the destination stat attributes are the same as in the database.
+
+        Returns:
+            bool: True if unchanged.
+        """
+        if self._paranoid or not self._hash_old:
+            return False
+
+        try:
+            stat = lstat(self._path)
+        except FileNotFoundError:
+            return False
+
+        db_info = self._db_info
+        for key in _STAT_KEYS:
+            if getattr(stat, key) != db_info[key]:
+                return False
+        return True
+
     def write(self, data=b""):
         """
         Write the new content into a file.
@@ -207,6 +300,8 @@ class Dst:
             if hasattr(data, "read"):
                 update_hash = self._hash_obj.update
                 write = self._file_obj.write
+                tell = self._file_obj.tell
+                spooled = self._spooled
                 read = data.read
                 while True:
                     chunk = read(BUFFER_SIZE)
@@ -215,31 +310,155 @@ class Dst:
                     update_hash(chunk)
                     write(chunk)
 
+                    if spooled and tell() > SPOOL_SIZE:
+                        self._freeze()
+                        write = self._file_obj.write
+                        spooled = False
+
                 self.close()
 
             # Content are bytes to append to destination
             else:
                 self._hash_obj.update(data)
                 self._file_obj.write(data)
+                if self._spooled and self._file_obj.tell() > SPOOL_SIZE:
+                    self._freeze()
 
         elif self._type == "dir":
             makedirs(self._path, exist_ok=True)
 
         elif self._type == "link":
             data = fsencode(data)
+            self._make_parent()
             symlink(data, self._path_part)
             self._hash_obj.update(data)
 
+    def _make_parent(self):
+        """
+        Ensure the parent directory of the destination exists.
+        """
+        makedirs(dirname(self._path), exist_ok=True)
+
+    def _freeze(self):
+        """
+        Write the new content buffered in memory to the part file on disk.
+        """
+        buffer = self._file_obj
+        self._make_parent()
+        self._file_obj = open(self._path_part, "wb")
+        self._file_obj.write(buffer.getbuffer())
+        buffer.close()
+        self._spooled = False
+        self._write_resume()
+
+    def get_resume(self, url):
+        """
+        Get information to resume a previously interrupted write of this destination.
+
+        Args:
+            url (str): URL of the new content.
+
+        Returns:
+            tuple: Offset of the content already written (0 if cannot be resumed),
+                Validator of the content (ETag or Last-Modified header value).
+        """
+        path = self._path + _RSM_EXT
+        try:
+            with open(path, "rt") as file:
+                resume = load(file)
+            size = getsize(self._path_part)
+        except (OSError, ValueError, TypeError):
+            return 0, None
+
+        if resume.get("url") != url or not resume.get("validator"):
+            return 0, None
+        return size, resume["validator"]
+
+    def set_resumable(self, url, validator):
+        """
+        Keep the written content if interrupted to allow to resume later.
+
+        Args:
+            url (str): URL of the new content.
+            validator (str): Validator of the content (ETag or Last-Modified header
+                value). If None, the content cannot be resumed.
+        """
+        if validator and self._type == "file":
+            self._resume = dict(url=url, validator=validator)
+            self._write_resume()
+
+    def resume(self, offset):
+        """
+        Resume the write of the new content after the content already written in
+        the part file.
+
+        Args:
+            offset (int): Offset where to resume.
+        """
+        self._file_obj.close()
+        self._file_obj = file = open(self._path_part, "r+b")
+        self._spooled = False
+        file.truncate(offset)
+
+        # Restore the hash state from the content already written
+        update_hash = self._hash_obj.update
+        read = file.read
+        while True:
+            chunk = read(BUFFER_SIZE)
+            if not chunk:
+                break
+            update_hash(chunk)
+
+    def allocate(self, size, offset=0):
+        """
+        Allocate the part file on disk to let the new content be written directly in
+        it by another writer (For instance, a parallel download). The new content is
+        hashed from the part file when closing the destination.
+
+        Args:
+            size (int): Size of the new content.
+            offset (int): Size of the new content already written in the part file
+                by a previous write, kept in the allocated part file.
+
+        Returns:
+            str: Part file path.
+        """
+        self._file_obj.close()
+        self._file_obj = None
+        self._spooled = False
+        self._make_parent()
+        with open(self._path_part, "r+b" if offset else "wb") as file:
+            file.truncate(size)
+        self._allocated = True
+
+        # The part file is re-created, and is not resumable this way
+        self._clear_resume()
+        return self._path_part
+
+    def _write_resume(self):
+        """
+        Write information required to resume the write of the part file, or remove
+        outdated information if the part file is not resumable.
+        """
+        if self._spooled:
+            return
+        elif self._resume is None:
+            remove_existing(self._path + _RSM_EXT)
+        else:
+            with open(self._path + _RSM_EXT, "wt") as file:
+                dump(self._resume, file)
+
     def close(self):
         """
         Close pending write of data and check if update is required or not based on hash
         comparison.
         """
-        if self._file_obj is None:
+        if self._hash_obj is None or self._type == "dir":
             return
 
-        self._file_obj.close()
-        self._file_obj = None
+        # Hash the new content written in the part file by another writer
+        if self._allocated:
+            _hash_file(self._path_part, self._hash_obj)
 
         # Get new content hash
         self._hash_new = self._hash_obj.hexdigest()
@@ -261,7 +480,12 @@ class Dst:
                 self.cancel()
             return
 
-        # Update required in any other case
+        # Update required in any other case, ensure new content is on disk
+        if self._spooled:
+            self._freeze()
+        if self._file_obj is not None:
+            self._file_obj.close()
+            self._file_obj = None
         self._update = True
 
     def move(self, mtime=None):
@@ -280,6 +504,12 @@ class Dst:
 
             # Move new content to new destination
             rename(self._path_part, self._path)
+            self._path_part = None
+            self._clear_resume()
+
+            # Links stat are the stat of their target
+            if self._type == "link":
+                return
 
             # Update stat based on previous version
             try:
@@ -291,7 +521,6 @@ class Dst:
             mtime = mtime or self._mtime
             if mtime is not None:
                 utime(self._path, (time(), mtime))
-            self._path_part = None
 
     def clear(self):
         """
@@ -301,6 +530,16 @@ class Dst:
             remove_existing(self._path_bak)
             self._path_bak = None
 
+    def _clear_resume(self):
+        """
+        Remove information required to resume the write of the part file.
+
+        Information from a previous write is also removed, even if this write is
+        not resumable.
+        """
+        remove_existing(self._path + _RSM_EXT)
+        self._resume = None
+
     def cancel(self, msg=None):
         """
         Cancel any action on the destination.
@@ -316,10 +555,11 @@ class Dst:
         if self._path_part is not None:
             remove_existing(self._path_part)
             self._path_part = None
+            self._clear_resume()
 
         if self._path_bak is not None:
             if exists(self._path_bak):
-                remove_existing(self._path_part)
+                remove_existing(self._path)
                 rename(self._path_bak, self._path)
             self._path_bak = None
 
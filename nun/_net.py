@@ -0,0 +1,511 @@
+"""Network"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock, Event
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from nun._dst import BUFFER_SIZE
+
+# Number of hosts to keep connections pools for
+_POOLS = 16
+
+# Platforms APIs, connections to them are limited separately from download hosts
+_API_PREFIXES = ("https://api.github.com/",)
+
+# Minimum size of a content to download it by ranges in parallel
+SEGMENTED_SIZE = 67108864
+
+# Maximum number of ranges downloaded in parallel for a same content
+SEGMENTS = 8
+
+# Size of the content blocks cached by "RangeFile"
+_BLOCK_SIZE = 262144
+
+# Maximum number of content blocks cached by "RangeFile"
+_BLOCKS = 64
+
+_LOCK = Lock()
+_SESSION = dict(session=None, pool_size=10, connections=None, api_connections=8)
+
+
+def set_pool_size(size):
+    """
+    Set the maximum number of kept alive connections per host.
+
+    This should be the number of threads that can perform requests in parallel.
+
+    Args:
+        size (int): Number of connections.
+    """
+    with _LOCK:
+        _SESSION["pool_size"] = size
+        _remount_adapters()
+
+
+def set_connections(connections=None, api_connections=None):
+    """
+    Set the maximum number of connections in parallel per host.
+
+    Requests exceeding it wait until a connection of the host is released.
+
+    Args:
+        connections (int): Maximum number of connections to a same download host.
+            If not specified, keep the current value. Not limited by default.
+        api_connections (int): Maximum number of connections to a same platform
+            API. If not specified, keep the current value.
+    """
+    for value in (connections, api_connections):
+        if value is not None and value < 1:
+            raise ValueError("The number of connections must be positive.")
+
+    with _LOCK:
+        if connections is not None:
+            _SESSION["connections"] = connections
+        if api_connections is not None:
+            _SESSION["api_connections"] = api_connections
+        _remount_adapters()
+
+
+def get_session():
+    """
+    Get the HTTP session shared by the whole process.
+
+    Connections are pooled per host and reused by all platforms and sources,
+    including on redirections (For instance, from "github.com" to
+    "codeload.github.com" or "objects.githubusercontent.com").
+
+    Returns:
+        requests.Session: Session.
+    """
+    session = _SESSION["session"]
+    if session is not None:
+        return session
+
+    with _LOCK:
+        session = _SESSION["session"]
+        if session is None:
+            session = Session()
+            _mount_adapters(session)
+            _SESSION["session"] = session
+        return session
+
+
+def _remount_adapters():
+    """
+    Mount adapters again on the session, if already created, to apply new settings.
+
+    Must be called with the lock acquired.
+    """
+    session = _SESSION["session"]
+    if session is not None:
+        _mount_adapters(session)
+
+
+def _mount_adapters(session):
+    """
+    Mount connection pooling adapters on a session.
+
+    Args:
+        session (requests.Session): Session.
+    """
+    # Download hosts
+    connections = _SESSION["connections"]
+    adapters = {
+        prefix: HTTPAdapter(
+            pool_connections=_POOLS,
+            pool_maxsize=connections or _SESSION["pool_size"],
+            pool_block=connections is not None,
+        )
+        for prefix in ("https://", "http://")
+    }
+
+    # Platforms APIs, more specific prefixes take precedence
+    for prefix in _API_PREFIXES:
+        adapters[prefix] = HTTPAdapter(
+            pool_maxsize=_SESSION["api_connections"], pool_block=True
+        )
+
+    mounted = session.adapters
+    for prefix, adapter in adapters.items():
+        previous = mounted.get(prefix)
+        session.mount(prefix, adapter)
+        if previous is not None:
+            previous.close()
+
+
+def accept_ranges(headers):
+    """
+    Check if a content can be read by ranges.
+
+    Args:
+        headers (dict): Headers of the full content response.
+
+    Returns:
+        bool: True if can be read by ranges.
+    """
+    return (
+        headers.get("Accept-Ranges") == "bytes"
+        and "Content-Encoding" not in headers
+        and ("ETag" in headers or "Last-Modified" in headers)
+    )
+
+
+def can_get_ranges(headers, size):
+    """
+    Check if a content can be downloaded by ranges in parallel.
+
+    Args:
+        headers (dict): Headers of the full content response.
+        size (int): Content size.
+
+    Returns:
+        bool: True if can be downloaded by ranges.
+    """
+    return size >= SEGMENTED_SIZE and accept_ranges(headers)
+
+
+def get_ranges(url, paths, size, add_size, validator, first=None, offset=0):
+    """
+    Download a content by ranges in parallel and write them in allocated files.
+
+    Args:
+        url (str): Content URL.
+        paths (iterable of str): Paths of the files where to write the content, the
+            files must already be allocated to the content size.
+        size (int): Content size.
+        add_size (function): Callback to call with the size of each written chunk.
+        validator (str): Validator (ETag or Last-Modified header value) of the
+            content. Ensure all ranges are from the same content.
+        first (nun._src.Body): If specified, already opened content stream starting
+            at "offset", used for the first range. This stream must update the size
+            by itself. Its connection is released once the first range is written,
+            to not hold it while waiting for other ranges.
+        offset (int): Offset of the content to download, the content before it is
+            already in the files.
+    """
+    paths = tuple(paths)
+    remaining = size - offset
+    segments = min(SEGMENTS, -(-remaining // (SEGMENTED_SIZE // SEGMENTS)))
+    segment_size = -(-remaining // segments)
+    ranges = [
+        (start, min(start + segment_size, size))
+        for start in range(offset, size, segment_size)
+    ]
+    failed = Event()
+
+    with ThreadPoolExecutor(len(ranges)) as executor:
+        futures = []
+        add_future = futures.append
+        for start, end in ranges[1 if first else 0 :]:
+            add_future(
+                executor.submit(
+                    _get_range, url, paths, start, end, add_size, validator, failed
+                )
+            )
+
+        # Use the already opened stream for the first range
+        if first is not None:
+            start, end = ranges[0]
+            _write_range(first.read, paths, start, end, None, failed)
+            first.release()
+
+        for future in futures:
+            future.result()
+
+
+def _get_range(url, paths, start, end, add_size, validator, failed):
+    """
+    Download a content range and write it in files.
+
+    Args:
+        url (str): Content URL.
+        paths (tuple of str): Paths of the files where to write the range.
+        start (int): Range start.
+        end (int): Range end (excluded).
+        add_size (function): Callback to call with the size of each written chunk.
+        validator (str): Validator (ETag or Last-Modified header value) of the
+            content.
+        failed (threading.Event): Set on failure to stop all other ranges.
+    """
+    try:
+        with _request_range(url, start, end, validator) as resp:
+            read = partial(resp.raw.read, decode_content=False)
+            _write_range(read, paths, start, end, add_size, failed)
+
+    except BaseException:
+        failed.set()
+        raise
+
+
+def _request_range(url, start, end, validator):
+    """
+    Request a content range, and check the response is this exact range before
+    reading its content.
+
+    Args:
+        url (str): Content URL.
+        start (int): Range start.
+        end (int): Range end (excluded).
+        validator (str): Validator (ETag or Last-Modified header value) of the
+            content.
+
+    Returns:
+        requests.Response: Streamed response.
+    """
+    headers = {"Range": f"bytes={start}-{end - 1}", "If-Range": validator}
+    resp = get_session().get(url, headers=headers, stream=True)
+    try:
+        resp.raise_for_status()
+
+        # The full content is returned if modified since the validator
+        if resp.status_code != 206 or not resp.headers.get(
+            "Content-Range", ""
+        ).startswith(f"bytes {start}-{end - 1}/"):
+            raise RuntimeError(f'Unable to get a range of "{url}".')
+
+    except BaseException:
+        resp.close()
+        raise
+    return resp
+
+
+def _write_range(read, paths, start, end, add_size, failed):
+    """
+    Write a content range in files.
+
+    Args:
+        read (function): Content read function.
+        paths (tuple of str): Paths of the files where to write the range.
+        start (int): Range start.
+        end (int): Range end (excluded).
+        add_size (function): Callback to call with the size of each written chunk.
+            If None, the read function is assumed to update the size itself.
+        failed (threading.Event): Set on failure to stop all other ranges.
+    """
+    files = []
+    try:
+        for path in paths:
+            file = open(path, "r+b")
+            files.append(file)
+            file.seek(start)
+        writes = [file.write for file in files]
+
+        remaining = end - start
+        while remaining:
+            if failed.is_set():
+                # Another range failed, its exception is raised instead
+                return
+
+            chunk = read(min(BUFFER_SIZE, remaining))
+            if not chunk:
+                raise EOFError("Range content is incomplete.")
+            for write in writes:
+                write(chunk)
+            remaining -= len(chunk)
+            if add_size is not None:
+                add_size(len(chunk))
+
+    except BaseException:
+        failed.set()
+        raise
+
+    finally:
+        for file in files:
+            file.close()
+
+
+class RangeFile:
+    """
+    Read-only seekable file-like object over an HTTP content, read with range
+    requests.
+
+    Read blocks are cached, so small reads like the ones performed to parse
+    archives headers do not require a request each. Sequential reads request
+    increasingly larger ranges.
+
+    Args:
+        url (str): Content URL.
+        size (int): Content size.
+        validator (str): Validator (ETag or Last-Modified header value) of the
+            content. Ensure all ranges are from the same content.
+        add_size (function): Callback to call with the size of each received range.
+    """
+
+    __slots__ = (
+        "_url",
+        "_size",
+        "_validator",
+        "_add_size",
+        "_position",
+        "_blocks",
+        "_next_block",
+        "_read_ahead",
+        "closed",
+    )
+
+    def __init__(self, url, size, validator, add_size):
+        self._url = url
+        self._size = size
+        self._validator = validator
+        self._add_size = add_size
+        self._position = 0
+        self._blocks = dict()
+        self._next_block = None
+        self._read_ahead = 1
+        self.closed = False
+
+    @staticmethod
+    def readable():
+        """
+        Return True, the file is readable.
+
+        Returns:
+            bool: True.
+        """
+        return True
+
+    @staticmethod
+    def seekable():
+        """
+        Return True, the file is seekable.
+
+        Returns:
+            bool: True.
+        """
+        return True
+
+    def tell(self):
+        """
+        Return current read position.
+
+        Returns:
+            int: Position.
+        """
+        return self._position
+
+    def seek(self, offset, whence=0):
+        """
+        Change the read position.
+
+        Args:
+            offset (int): Offset.
+            whence (int): 0 for start of the file, 1 for current position, 2 for
+                end of the file.
+
+        Returns:
+            int: New position.
+        """
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        """
+        Read data.
+
+        Args:
+            size (int): Maximum size to read. If -1, read until the end.
+
+        Returns:
+            bytes: Read data.
+        """
+        position = self._position
+        end = self._size if size < 0 else min(position + size, self._size)
+        chunks = []
+        append_chunk = chunks.append
+        while position < end:
+            index = position // _BLOCK_SIZE
+            block_start = index * _BLOCK_SIZE
+            chunk = self._get_block(index, end)[
+                position - block_start : end - block_start
+            ]
+            append_chunk(chunk)
+            position += len(chunk)
+
+        self._position = position
+        return b"".join(chunks)
+
+    def _get_block(self, index, end):
+        """
+        Get a content block from the cache, or request it with following blocks.
+
+        Args:
+            index (int): Block index.
+            end (int): End of the content to read.
+
+        Returns:
+            bytes: Block.
+        """
+        blocks = self._blocks
+        try:
+            # Move the block to the end of the cache as most recently used
+            blocks[index] = block = blocks.pop(index)
+            return block
+        except KeyError:
+            pass
+
+        # Request all missing blocks to read at once, plus some following blocks
+        # if reading sequentially
+        if index == self._next_block:
+            self._read_ahead = min(self._read_ahead * 2, _BLOCKS // 4)
+        else:
+            self._read_ahead = 1
+        last = max((end - 1) // _BLOCK_SIZE, index + self._read_ahead - 1)
+        last = min(last, index + _BLOCKS // 2 - 1, (self._size - 1) // _BLOCK_SIZE)
+        for cached in range(index + 1, last + 1):
+            if cached in blocks:
+                last = cached - 1
+                break
+        self._next_block = last + 1
+
+        start = index * _BLOCK_SIZE
+        data = self._get_range(start, min((last + 1) * _BLOCK_SIZE, self._size))
+        for block_index in range(index, last + 1):
+            block_start = (block_index - index) * _BLOCK_SIZE
+            blocks[block_index] = data[block_start : block_start + _BLOCK_SIZE]
+
+        # Remove least recently used blocks
+        while len(blocks) > _BLOCKS:
+            del blocks[next(iter(blocks))]
+
+        return blocks[index]
+
+    def _get_range(self, start, end):
+        """
+        Request a content range.
+
+        Args:
+            start (int): Range start.
+            end (int): Range end (excluded).
+
+        Returns:
+            bytes: Range content.
+        """
+        size = end - start
+        with _request_range(self._url, start, end, self._validator) as resp:
+            data = resp.raw.read(size, decode_content=False)
+        if len(data) != size:
+            raise EOFError("Range content is incomplete.")
+
+        self._add_size(len(data))
+        return data
+
+    def close(self):
+        """
+        Close the file and clear its cache.
+        """
+        self._blocks.clear()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -37,14 +37,34 @@ class PltBase(ABC):
     """
 
     @abstractmethod
-    def get_src_list(self, res_name, res_id):
+    def get_src_list(self, res_name, res_id, src_rows=None):
         """
         Get sources from a specific resource.
 
+        Sources must be created quickly, without performing requests, their
+        actions are performed later in parallel.
+
         Args:
             res_name (str): Resource name.
             res_id (int): Resource ID.
+            src_rows (dict): Sources information from the database, per source
+                name, to pass to "nun._src.get_src".
 
         Returns:
             iterable of nun._src.SrcBase subclass: Sources.
         """
+
+    def get_unchanged(self, resources):
+        """
+        Get resources unchanged since their sources revisions, checked at once.
+
+        This allows platforms to check many resources with a few requests before
+        updating them. By default, no resource is checked this way.
+
+        Args:
+            resources (dict): Sources revisions per source name, per resource name.
+
+        Returns:
+            set of str: Names of unchanged resources.
+        """
+        return set()
@@ -1,11 +1,13 @@
 """GitHub"""
+from collections import Counter
 from email.utils import parsedate_to_datetime
 from datetime import datetime, timedelta
 from fnmatch import fnmatch
 from time import sleep
 
-from requests import Session
+from requests import RequestException
 
+from nun._net import get_session
 from nun._plt import PltBase
 from nun._srg import get_cache, set_cache, get_secret
 from nun._src import get_src
@@ -15,6 +17,20 @@ GITHUB = "https://github.com"
 GITHUB_API = "https://api.github.com"
 GITHUB_RAW = "https://raw.githubusercontent.com"
 
+# Maximum number of repositories checked in a same GraphQL query
+_GRAPHQL_REPOSITORIES = 50
+
+# Maximum number of release assets returned by a GraphQL query
+_GRAPHQL_ASSETS = 100
+
+# GraphQL fragments to get references information
+_GRAPHQL_FRAGMENTS = (
+    "fragment release on Release { tagName createdAt "
+    f"releaseAssets(first: {_GRAPHQL_ASSETS}) "
+    "{ totalCount nodes { name updatedAt downloadUrl } } } "
+    "fragment branch on Ref { name target { oid } }"
+)
+
 
 class Plt(PltBase):
     """
@@ -24,11 +40,7 @@ class Plt(PltBase):
     _GITHUB_API_HEADERS = None
     _RATE_LIMIT_WARNED = False
 
-    __slots__ = ("_http_request", "_http_session")
-
-    def __init__(self):
-        self._http_session = Session()
-        self._http_request = self._http_session.request
+    __slots__ = ()
 
     @staticmethod
     def _parse_res_name(res_name):
@@ -102,7 +114,7 @@ class Plt(PltBase):
         Returns:
             requests.Response: Response.
         """
-        response = self._http_request(method, url, **kwargs)
+        response = get_session().request(method, url, **kwargs)
         if ignore_status and response.status_code not in ignore_status:
             response.raise_for_status()
 
@@ -161,6 +173,36 @@ class Plt(PltBase):
         )
         return result, status
 
+    def _github_graphql(self, query, variables):
+        """
+        Make a query to the Github GraphQL API.
+        https://docs.github.com/graphql
+
+        Args:
+            query (str): GraphQL query.
+            variables (dict): Query variables.
+
+        Returns:
+            dict: Query result data. Fields that are not found are None.
+        """
+        # On any error, the resources are checked with the REST API instead
+        try:
+            resp = self._request(
+                GITHUB_API + "/graphql",
+                method="POST",
+                headers=self._api_headers(),
+                json=dict(query=query, variables=variables),
+                ignore_status=(403,),
+            )
+
+            # Rate limit reached, or other permission error
+            if resp.status_code == 403:
+                return dict()
+            return resp.json().get("data") or dict()
+
+        except (RequestException, ValueError):
+            return dict()
+
     def _wait_rate_limit(self):
         """
         Wait until remaining rate limit is greater than 0.
@@ -301,21 +343,41 @@ class Plt(PltBase):
 
         self._raise_not_found(owner)
 
-    def get_src_list(self, res_name, res_id):
+    def get_src_list(self, res_name, res_id, src_rows=None):
         """
         Get sources from a specific resource.
 
         Args:
             res_name (str): Resource name.
             res_id (int): Task ID.
+            src_rows (dict): Sources information from the database, per source
+                name.
 
         Returns:
             generator of nun._src.SrcBase subclass: Sources.
         """
         owner, repo, ref, src = self._parse_res_name(res_name)
+        for name, url, kwargs in self._list_src(
+            owner, repo, ref, src, self._get_reference(owner, repo, ref)
+        ):
+            yield get_src(name, url, res_name, res_id, src_rows=src_rows, **kwargs)
 
-        # Get reference information
-        ref_info = self._get_reference(owner, repo, ref)
+    @staticmethod
+    def _list_src(owner, repo, ref, src, ref_info):
+        """
+        List sources of a resource.
+
+        Args:
+            owner (str): Repository owner.
+            repo (str): Repository name
+            ref (str): Reference name.
+            src (str): Source.
+            ref_info (dict): Reference information.
+
+        Returns:
+            list of tuple: Sources name, URL and "nun._src.get_src" keyword
+                arguments.
+        """
         ref = ref_info.get("ref", ref)
 
         # Archives
@@ -325,46 +387,166 @@ class Plt(PltBase):
             else:
                 ext = "tar.gz"
                 file_type = "tar"
-            yield get_src(
-                f"{owner}-{repo}-{ref}.{ext}",
-                f"{GITHUB}/{owner}/{repo}/{src}/{ref}",
-                res_name,
-                res_id,
-                src_type=file_type,
-                strip_components=1,
-                revision=ref_info["revision"],
-            )
-            return
+            return [
+                (
+                    f"{owner}-{repo}-{ref}.{ext}",
+                    f"{GITHUB}/{owner}/{repo}/{src}/{ref}",
+                    dict(
+                        src_type=file_type,
+                        strip_components=1,
+                        revision=ref_info["revision"],
+                    ),
+                )
+            ]
 
         # Release assets
-        if ref_info.get("assets"):
-            yield_assets = False
-            for asset in ref_info["assets"]:
-                if fnmatch(asset["name"], src):
-                    yield get_src(
-                        asset["name"],
-                        asset["browser_download_url"],
-                        res_name,
-                        res_id,
-                        mtime=asset["updated_at"],
-                        revision=asset["updated_at"],
-                    )
-                    yield_assets = True
-            if yield_assets:
-                return
+        assets = [
+            (
+                asset["name"],
+                asset["browser_download_url"],
+                dict(mtime=asset["updated_at"], revision=asset["updated_at"]),
+            )
+            for asset in ref_info.get("assets") or ()
+            if fnmatch(asset["name"], src)
+        ]
+        if assets:
+            return assets
 
         # Raw file
         # TODO: Get Git tree and apply fnmatch on it
         #       /repos/:owner/:repo/git/trees/:tree_sha
         #       /repos/:owner/:repo/git/trees/:tree_sha?recursive=1
-        yield get_src(
-            src,
-            f"{GITHUB_RAW}/{owner}/{repo}/{ref}/{src}",
-            res_name,
-            res_id,
-            revision=ref_info["revision"],
+        return [
+            (
+                src,
+                f"{GITHUB_RAW}/{owner}/{repo}/{ref}/{src}",
+                dict(revision=ref_info["revision"]),
+            )
+        ]
+
+    def get_unchanged(self, resources):
+        """
+        Get resources unchanged since their sources revisions, checked at once.
+
+        The release or branch of many repositories is resolved with a few GraphQL
+        queries, instead of up to four REST API requests per resource. Resources
+        referencing Git tags or commits are not checked.
+
+        Args:
+            resources (dict): Sources revisions per source name, per resource name.
+
+        Returns:
+            set of str: Names of unchanged resources.
+        """
+        # The GraphQL API requires authentication
+        if "Authorization" not in self._api_headers():
+            return set()
+
+        unchanged = set()
+        resources = list(resources.items())
+        for index in range(0, len(resources), _GRAPHQL_REPOSITORIES):
+            unchanged.update(
+                self._get_unchanged(resources[index : index + _GRAPHQL_REPOSITORIES])
+            )
+        return unchanged
+
+    def _get_unchanged(self, resources):
+        """
+        Get resources unchanged since their sources revisions with a GraphQL query.
+
+        Args:
+            resources (list of tuple): Resource name, and sources revisions per
+                source name.
+
+        Returns:
+            set of str: Names of unchanged resources.
+        """
+        declarations = []
+        fields = []
+        variables = dict()
+        parsed = []
+        for index, (res_name, _) in enumerate(resources):
+            owner, repo, ref, src = self._parse_res_name(res_name)
+            parsed.append((owner, repo, ref, src))
+
+            variables[f"owner{index}"] = owner
+            variables[f"repo{index}"] = repo
+            declarations += (f"$owner{index}: String!", f"$repo{index}: String!")
+            if ref:
+                variables[f"tag{index}"] = ref
+                variables[f"branch{index}"] = f"refs/heads/{ref}"
+                declarations += (f"$tag{index}: String!", f"$branch{index}: String!")
+                release = f"release(tagName: $tag{index})"
+                branch = f"ref(qualifiedName: $branch{index})"
+            else:
+                release = "latestRelease"
+                branch = "defaultBranchRef"
+
+            fields.append(
+                f"r{index}: repository(owner: $owner{index}, name: $repo{index}) "
+                f"{{ release: {release} {{ ...release }} "
+                f"branch: {branch} {{ ...branch }} }}"
+            )
+
+        data = self._github_graphql(
+            f'query({", ".join(declarations)}) {{ {" ".join(fields)} }} '
+            f"{_GRAPHQL_FRAGMENTS}",
+            variables,
         )
 
+        unchanged = set()
+        for index, (res_name, revisions) in enumerate(resources):
+            ref_info = self._get_graphql_reference(data.get(f"r{index}"))
+            if ref_info is None:
+                continue
+
+            # Stored sources names may differ from the listed ones, since they can
+            # be updated from the response headers: Compare revisions only
+            if Counter(revisions.values()) == Counter(
+                kwargs["revision"]
+                for _, _, kwargs in self._list_src(*parsed[index], ref_info)
+            ):
+                unchanged.add(res_name)
+        return unchanged
+
+    @staticmethod
+    def _get_graphql_reference(repository):
+        """
+        Get reference information from a GraphQL repository result.
+
+        Args:
+            repository (dict or None): Repository result.
+
+        Returns:
+            dict or None: dict of reference information, in the same format as
+                returned by the REST API based methods. None if not found.
+        """
+        if not repository:
+            return None
+
+        release = repository["release"]
+        if release:
+            assets = release["releaseAssets"]
+            if assets["totalCount"] > len(assets["nodes"]):
+                # Some assets are missing
+                return None
+            return dict(
+                ref=release["tagName"],
+                revision=release["createdAt"],
+                assets=[
+                    dict(
+                        name=asset["name"],
+                        browser_download_url=asset["downloadUrl"],
+                        updated_at=asset["updatedAt"],
+                    )
+                    for asset in assets["nodes"]
+                ],
+            )
+
+        branch = repository["branch"]
+        if branch:
+            return dict(ref=branch["name"], revision=branch["target"]["oid"])
+
     def _get_reference(self, owner, repo, ref):
         """
         Reference.
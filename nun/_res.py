@@ -1,4 +1,6 @@
 """Tasks"""
+from math import inf
+
 from nun._db import DB
 from nun._dst import remove_existing
 from nun._plt import get_plt
@@ -8,7 +10,15 @@ from nun.exceptions import InvalidException
 class Res:
     """Resource"""
 
-    __slots__ = ("_name", "_res_id", "_tsk_id", "_action", "_arguments", "_db_info")
+    __slots__ = (
+        "_name",
+        "_res_id",
+        "_tsk_id",
+        "_action",
+        "_arguments",
+        "_db_info",
+        "_src_rows",
+    )
 
     def __init__(self, tsk_id, res_id=None, name=None, action=None, arguments=None):
         self._tsk_id = tsk_id
@@ -21,131 +31,239 @@ class Res:
         if not res_id and db_info:
             res_id = db_info["id"]
         self._res_id = res_id
+        self._src_rows = None
+
+    @property
+    def name(self):
+        """
+        Resource name.
+
+        Returns:
+            str: name.
+        """
+        return self._name
+
+    @property
+    def src_revisions(self):
+        """
+        Revisions of the resource sources, from the database.
+
+        Returns:
+            dict: Revisions per source name.
+        """
+        return {name: row["revision"] for name, row in self._get_src_rows().items()}
 
-    def apply(self, task_action, submit, force=False):
+    def apply(
+        self,
+        task_action,
+        schedule,
+        force=False,
+        paranoid=False,
+        cache=True,
+        unchanged=False,
+    ):
         """
-        Apply the task action on the resource.
+        Schedule the task action on the resource.
 
         Args:
             task_action (str): Task action to apply.
-            submit (function): Task executor submit function.
+            schedule (function): Task scheduler schedule function.
             force (bool): If True, force operation.
+            paranoid (bool): If True, always hash existing destinations.
+            cache (bool): If True, use the downloaded artifacts cache.
+            unchanged (bool): If True, the resource is known to be unchanged since
+                its last update, only its last task ID is updated.
         """
+        if task_action == "remove":
+            schedule(self._remove, schedule, pool="disk")
+            return
+
+        elif task_action == "update" and unchanged:
+            schedule(self._commit, pool="disk")
+            return
+
+        # Resolve longest resources first, based on the previous tasks
+        priority = self._expected_duration()
         if task_action == "update":
-            self._update(submit, force)
-        elif task_action == "remove":
-            self._remove(submit)
+            schedule(self._update, schedule, force, paranoid, cache, priority=priority)
         else:
-            self._create(submit, force)
+            schedule(self._create, schedule, force, paranoid, cache, priority=priority)
+
+    def _expected_duration(self):
+        """
+        Expected duration of the resource action, from the previous tasks.
+
+        Returns:
+            float: Duration in seconds. Infinite if unknown.
+        """
+        if not self._res_id:
+            return inf
+
+        duration = 0.0
+        for src_row in self._get_src_rows().values():
+            if src_row["duration"] is None:
+                return inf
+            duration += src_row["duration"]
+        return duration or inf
 
-    def _create(self, submit, force=False):
+    def _create(self, schedule, force=False, paranoid=False, cache=True):
         """
         Create a new resource.
 
         Args:
-            submit (function): Task executor submit function.
+            schedule (function): Task scheduler schedule function.
             force (bool): If True, force operation.
+            paranoid (bool): If True, always hash existing destinations.
+            cache (bool): If True, use the downloaded artifacts cache.
         """
         if not force and self._res_id:
             raise InvalidException(f"Already installed: {self._name}")
 
         # Create the resource in the database
-        self._res_id = DB.set_res(
+        self._res_id = DB.submit(
+            "set_res",
             self._tsk_id,
             name=self._name,
             action=self._action,
             arguments=self._arguments,
-        )
+        ).result()
+        self._src_rows = None
 
         # Do action
-        self._do_action(submit, force)
+        self._do_action(schedule, force, paranoid, cache)
 
-    def _remove(self, submit):
+    def _remove(self, schedule):
         """
         Remove an existing resource.
 
         Args:
-            submit (function): Task executor submit function.
+            schedule (function): Task scheduler schedule function.
         """
         if not self._res_id:
             raise InvalidException(f"Not installed: {self._name}")
 
-        futures = list()
-        add_future = futures.append
+        # Remove source and destinations, then the resource
         remove_src = self._remove_src
+        futures = [
+            schedule(remove_src, src_row["id"], pool="disk")
+            for src_row in self._get_src_rows().values()
+        ]
+        schedule(self._del_res, after=futures, pool="disk")
 
-        # Remove source and destinations
-        for src_row in DB.get_src_by_res(res_id=self._res_id):
-            add_future(submit(remove_src, src_row["id"]))
-
-        # Wait for completion
-        for future in futures:
-            future.result()
-
-        # Remove resource
-        DB.del_res(self._res_id)
+    def _del_res(self):
+        """
+        Remove the resource from the database.
+        """
+        DB.submit("del_res", self._res_id).result()
 
-    def _update(self, submit, force=False):
+    def _update(self, schedule, force=False, paranoid=False, cache=True):
         """
         Update an existing resource
 
         Args:
-            submit (function): Task executor submit function.
+            schedule (function): Task scheduler schedule function.
             force (bool): If True, force operation.
+            paranoid (bool): If True, always hash existing destinations.
+            cache (bool): If True, use the downloaded artifacts cache.
         """
         if not self._res_id:
             raise InvalidException(f"Not installed: {self._name}")
 
         # Do action
-        self._do_action(submit, force, update=True)
+        self._do_action(schedule, force, paranoid, cache, update=True)
 
-        # Update last Task ID on resource
-        DB.set_res(self._tsk_id, res_id=self._res_id)
-
-    def _do_action(self, submit, force, update=False):
+    def _do_action(self, schedule, force, paranoid, cache, update=False):
         """
-        Do the resource action.
+        Resolve the resource sources and schedule the action on them.
 
         Args:
-            submit (function): Task executor submit function.
+            schedule (function): Task scheduler schedule function.
             force (bool): If True, force operation.
+            paranoid (bool): If True, always hash existing destinations.
+            cache (bool): If True, use the downloaded artifacts cache.
             update (bool): If True, task is an update.
         """
-        src_futures = dict()
+        srcs = list()
+        futures = list()
+        add_src = srcs.append
+        add_future = futures.append
 
         # Do action on resource sources
-        for src in get_plt(self._name).get_src_list(self._name, self._res_id):
-            src_futures[src] = future = submit(
+        for src in get_plt(self._name).get_src_list(
+            self._name, self._res_id, self._get_src_rows()
+        ):
+            # Run after an identical download of the task, to get it from the cache
+            flight = src.register_flight() if cache else None
+
+            future = schedule(
                 getattr(src, self._action),
+                after=() if flight is None else (flight,),
                 update=update,
                 tsk_id=self._tsk_id,
                 force=force,
+                paranoid=paranoid,
+                cache=cache,
+                priority=src.expected_duration,
                 **self._arguments,
             )
             future.add_done_callback(src.set_done_callback)
+            add_src(src)
+            add_future(future)
 
         # Wait all write operations completion before start deletion operations
-        for future in src_futures.values():
-            future.result()
+        schedule(
+            self._remove_orphans, schedule, srcs, update, after=futures, pool="disk"
+        )
 
-        # Remove orphans destinations
-        src_ids = set()
+    def _remove_orphans(self, schedule, srcs, update=False):
+        """
+        Schedule the removal of orphans destinations and sources.
+
+        Args:
+            schedule (function): Task scheduler schedule function.
+            srcs (list of nun._src.SrcBase subclass): Current sources.
+            update (bool): If True, task is an update.
+        """
         futures = list()
         add_future = futures.append
+
+        # Remove orphans destinations
+        src_ids = set()
         add_src_id = src_ids.add
-        for src in src_futures:
-            add_future(submit(src.remove_orphans))
+        for src in srcs:
+            add_future(schedule(src.remove_orphans, pool="disk"))
             add_src_id(src.src_id)
 
         # Remove orphans sources
         remove_src = self._remove_src
-        for src_row in DB.get_src_by_res(res_id=self._res_id):
+        for src_row in self._get_src_rows().values():
             if src_row["id"] not in src_ids:
-                add_future(submit(remove_src, src_row["id"]))
+                add_future(schedule(remove_src, src_row["id"], pool="disk"))
+
+        # Update last Task ID on resource once completed
+        if update:
+            schedule(self._commit, after=futures, pool="disk")
+
+    def _get_src_rows(self):
+        """
+        Get the resource sources information from the database.
 
-        # Wait for completion
-        for future in futures:
-            future.result()
+        Sources information is loaded at once, and only once.
+
+        Returns:
+            dict: Sources information per source name.
+        """
+        src_rows = self._src_rows
+        if src_rows is None:
+            rows = DB.get_src_by_res(res_id=self._res_id) if self._res_id else ()
+            self._src_rows = src_rows = {row["name"]: row for row in rows}
+        return src_rows
+
+    def _commit(self):
+        """
+        Update the last task ID on the resource.
+        """
+        DB.submit("set_res", self._tsk_id, res_id=self._res_id).result()
 
     @staticmethod
     def _remove_src(src_id):
@@ -157,4 +275,4 @@ class Res:
         """
         for dst_row in DB.get_dst_by_src(src_id):
             remove_existing(dst_row["path"])
-        DB.del_src(src_id)
+        DB.submit("del_src", src_id).result()
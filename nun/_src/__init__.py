@@ -1,19 +1,36 @@
 """Files & packages formats"""
 from abc import ABC
+from concurrent.futures import Future, InvalidStateError
 from cgi import parse_header
 from dateutil.parser import parse
+from fnmatch import fnmatch
 from importlib import import_module
+from math import inf
 from os import fsdecode
 from os.path import join, isdir, realpath, dirname, expanduser, isabs, splitext
 from pathlib import PurePath
+from threading import Lock
+from time import time
 
-from requests import Session
-
-from nun._dst import Dst, remove_existing
+from nun._cmp import decompress_stream
+from nun._dst import BUFFER_SIZE, Dst, remove_existing
 from nun._db import DB
+from nun._net import get_session, can_get_ranges, get_ranges
+from nun._srg import Artifact, get_artifact
+
+# Downloads in progress in the current task, per URL and revision
+_FLIGHTS = dict()
+_FLIGHTS_LOCK = Lock()
 
 #: File types aliases
-ALIASES = {"tgz": "tar", "tbz": "tar", "tlz": "tar", "txz": "tar"}
+ALIASES = {
+    "tgz": "tar",
+    "tbz": "tar",
+    "tbz2": "tar",
+    "tlz": "tar",
+    "txz": "tar",
+    "tzst": "tar",
+}
 
 
 def get_src(
@@ -25,6 +42,7 @@ def get_src(
     mtime=None,
     strip_components=0,
     revision=None,
+    src_rows=None,
 ):
     """
     Sources factory.
@@ -39,6 +57,8 @@ def get_src(
         strip_components (int): strip NUMBER leading components from file path when
             extracting an archive.
         revision (str): File revision.
+        src_rows (dict): Sources information of the resource from the database, per
+            source name. If not specified, the source information is queried.
 
     Returns:
         nun._src.SrcBase subclass instance: Source
@@ -46,7 +66,7 @@ def get_src(
     # Detect file type based on its extension
     if src_type is None:
         filename, ext = splitext(name.lower())
-        if ext in (".gz", ".bz2", ".lz", ".xz") and filename.endswith(".tar"):
+        if ext in (".gz", ".bz2", ".lz", ".xz", ".zst") and filename.endswith(".tar"):
             # Handle the ".tar.<compression>" special case
             src_type = "tar"
         else:
@@ -67,9 +87,18 @@ def get_src(
         mtime=mtime,
         strip_components=strip_components,
         revision=revision,
+        src_rows=src_rows,
     )
 
 
+def clear_flights():
+    """
+    Clear the registry of downloads in progress of the current task.
+    """
+    with _FLIGHTS_LOCK:
+        _FLIGHTS.clear()
+
+
 class SrcBase(ABC):
     """
     Source base.
@@ -83,6 +112,8 @@ class SrcBase(ABC):
         strip_components (int): strip NUMBER leading components from file path when
             extracting an archive.
         revision (str): File revision.
+        src_rows (dict): Sources information of the resource from the database, per
+            source name. If not specified, the source information is queried.
     """
 
     __slots__ = (
@@ -101,8 +132,14 @@ class SrcBase(ABC):
         "_db_info",
         "_src_id",
         "_dst_ids",
-        "_session",
+        "_dst_rows",
+        "_force",
+        "_paranoid",
+        "_cache",
         "_strip_components",
+        "_include",
+        "_start",
+        "_flight",
     )
 
     def __init__(
@@ -114,6 +151,7 @@ class SrcBase(ABC):
         mtime=None,
         strip_components=0,
         revision=None,
+        src_rows=None,
     ):
 
         self._name = src_name
@@ -123,12 +161,19 @@ class SrcBase(ABC):
         self._exception = None
         self._output = None
         self._strip_components = strip_components
+        self._include = None
         self._trusted = False
         self._res_id = res_id
-        self._db_info = db_info = DB.get_src(res_id, src_name)
-        self._revision = self._get_revision(revision)
+        if src_rows is None:
+            self._db_info = db_info = DB.get_src(res_id, src_name)
+        else:
+            self._db_info = db_info = src_rows.get(src_name)
+        self._revision = revision
         self._dst_ids = None
-        self._session = Session()
+        self._dst_rows = None
+        self._force = False
+        self._paranoid = False
+        self._cache = True
         if db_info:
             self._src_id = db_info["id"]
         else:
@@ -141,6 +186,8 @@ class SrcBase(ABC):
         # For progress information
         self._size = 0
         self._size_done = 0
+        self._start = None
+        self._flight = None
 
     @property
     def name(self):
@@ -182,6 +229,19 @@ class SrcBase(ABC):
         """
         return self._size_done
 
+    @property
+    def expected_duration(self):
+        """
+        Expected duration of the operation, from the previous tasks.
+
+        Returns:
+            float: Duration in seconds. Infinite if unknown.
+        """
+        db_info = self._db_info
+        if db_info is None or db_info["duration"] is None:
+            return inf
+        return db_info["duration"]
+
     @property
     def done(self):
         """
@@ -227,30 +287,41 @@ class SrcBase(ABC):
         if (
             update
             and not force
+            and self._revision is not None
             and self._db_info is not None
-            and self._revision == self._db_info.revision
+            and self._revision == self._db_info["revision"]
         ):
-            self._dst_ids = True
+            self._dst_ids = None
             return True
         return False
 
-    def _get_revision(self, revision):
+    @staticmethod
+    def _conditional_headers(revision):
         """
-        Get a default revision from headers if not specified.
+        Get headers to perform a conditional request based on a known revision.
 
         Args:
-            revision (str or None): revision
+            revision (str): Revision.
 
         Returns:
-            str: revision
+            dict: Headers.
         """
-        if revision is not None:
-            return revision
+        if revision.startswith('"'):
+            # Revision is an ETag
+            return {"If-None-Match": revision}
+        return {"If-Modified-Since": revision}
 
-        resp = self._session.head(self._url)
-        resp.raise_for_status()
+    @staticmethod
+    def _get_revision(headers):
+        """
+        Get the revision from response headers.
 
-        headers = resp.headers
+        Args:
+            headers (dict): Response headers.
+
+        Returns:
+            str or None: revision
+        """
         etag = headers.get("ETag")
         if etag and not etag.startswith("W/"):
             return etag
@@ -267,6 +338,10 @@ class SrcBase(ABC):
         self._done = True
         self._exception = future.exception()
 
+        # Ensure identical downloads waiting this one are run
+        if self._flight is not None:
+            self._flight.set_done()
+
     def add_size_callback(self, size):
         """
         Callback to update file size completed.
@@ -294,37 +369,98 @@ class SrcBase(ABC):
             tsk_id (int): Task ID.
             dsts (iterable of nun._dst.Dst): destinations.
         """
-        # Update the source in the database
-        self._src_id = src_id = DB.set_src(
+        src_values = dict(
             ref_values=self._db_info,
             tsk_id=tsk_id,
             res_id=self._res_id,
             name=self._name,
             revision=self._revision,
             size=self._size,
+            duration=time() - self._start,
         )
 
-        if dsts:
-            # Update destinations in the database
-            self._dst_ids = set()
-            add = self._dst_ids.add
-            kwargs = dict(tsk_id=tsk_id, res_id=self._res_id, src_id=src_id)
+        # Update only the source in the database
+        if not dsts:
+            self._src_id = DB.submit("set_src", **src_values).result()
+            return
+
+        # Update the source and its destinations in the database at once
+        self._dst_ids = dst_ids = set()
+        rows = []
+        add_row = rows.append
+        for dst in dsts:
+            values = dst.db_values()
+            if values is None:
+                dst_ids.add(dst.db_id)
+            else:
+                add_row(values)
+
+        self._src_id, ids = DB.submit("set_src_dsts", dsts=rows, **src_values).result()
+        dst_ids.update(ids.values())
+
+    def _load_dst_rows(self):
+        """
+        Load all destinations of the resource from the database at once.
+        """
+        self._dst_rows = {row["path"]: row for row in DB.get_dst_by_res(self._res_id)}
+
+    def _new_dst(self, path, **kwargs):
+        """
+        Create a destination of this source.
+
+        Args:
+            path (str): Destination path.
+            kwargs: nun._dst.Dst keyword arguments.
+
+        Returns:
+            nun._dst.Dst: Destination.
+        """
+        try:
+            db_info = self._dst_rows[path]
 
-            for dst in dsts:
-                add(dst.db_update(**kwargs))
+        # Destinations not in the resource may still be owned by another resource
+        except KeyError:
+            db_info = DB.get_dst(path)
+
+        return Dst(
+            path,
+            self._res_id,
+            db_info=db_info,
+            force=self._force,
+            paranoid=self._paranoid,
+            **kwargs,
+        )
 
     def remove_orphans(self):
         """
         Remove orphan destinations.
         """
         dst_ids = self._dst_ids
-        del_dst = DB.del_dst
+        if dst_ids is None:
+            # Unchanged
+            return
+
+        futures = []
+        add_future = futures.append
+        submit = DB.submit
         for dst_row in DB.get_dst_by_src(self._src_id):
             if dst_row["id"] not in dst_ids:
                 remove_existing(dst_row["path"])
-                del_dst(dst_row["id"])
+                add_future(submit("del_dst", dst_row["id"]))
+
+        # Wait for database update
+        for future in futures:
+            future.result()
 
-    def download(self, output=".", force=False, update=False, tsk_id=None):
+    def download(
+        self,
+        output=".",
+        force=False,
+        update=False,
+        tsk_id=None,
+        paranoid=False,
+        cache=True,
+    ):
         """
         Download the file.
 
@@ -334,16 +470,67 @@ class SrcBase(ABC):
                 modified by user.
             update (bool): If True, is an update of an already in the database entry.
             tsk_id (int): Task ID.
+            paranoid (bool): If True, always hash existing destinations to detect
+                changes instead of trusting their stat attributes.
+            cache (bool): If True, use the downloaded artifacts cache.
         """
         if self._cancel(update, force):
             return
 
+        self._start = time()
+        self._force = force
+        self._paranoid = paranoid
+        self._cache = cache
         self._set_output(output)
         path = self._set_path(self._name, strip_components=0)
+        self._load_dst_rows()
 
         # Force strip_components=0 on a single file
-        with Dst(path, force=force, res_id=self._res_id) as dst:
-            dst.write(self._get())
+        with self._new_dst(path) as dst:
+            # Resume previous download if interrupted
+            offset, validator = dst.get_resume(self._url)
+            body = self._get(
+                conditional=update and not force, offset=offset, validator=validator
+            )
+            if body is None:
+                return
+
+            with body:
+                validator = self._get_revision(body.headers)
+
+                # Large file: Download it by ranges in parallel, after the content
+                # already downloaded, and add it to the cache at the same time
+                offset = body.offset
+                if can_get_ranges(body.headers, self._size - offset):
+                    paths = [dst.allocate(self._size, offset)]
+                    artifact = body.detach_artifact()
+                    if artifact is not None:
+                        paths.append(artifact.allocate(self._size))
+                    try:
+                        get_ranges(
+                            body.url,
+                            paths,
+                            self._size,
+                            self.add_size_callback,
+                            validator,
+                            first=body,
+                            offset=offset,
+                        )
+                        dst.close()
+                    except BaseException:
+                        if artifact is not None:
+                            artifact.discard()
+                        raise
+                    if artifact is not None:
+                        body.set_cached(Body.commit(artifact, dst.digest))
+
+                # Download it as a single stream, resuming previous download
+                else:
+                    if body.offset:
+                        dst.resume(body.offset)
+                    dst.set_resumable(self._url, validator)
+                    dst.write(body)
+
             dst.move(self._mtime)
             dst.clear()
 
@@ -357,6 +544,9 @@ class SrcBase(ABC):
         force=False,
         update=False,
         tsk_id=None,
+        paranoid=False,
+        include=None,
+        cache=True,
     ):
         """
         Extract the file.
@@ -372,17 +562,34 @@ class SrcBase(ABC):
                 modified by user.
             update (bool): If True, is an update of an already in the database entry.
             tsk_id (int): Task ID.
+            paranoid (bool): If True, always hash existing destinations to detect
+                changes instead of trusting their stat attributes.
+            include (iterable of str): If specified, extract only files with path
+                matching one of these glob patterns. Paths are matched after
+                leading components are stripped.
+            cache (bool): If True, use the downloaded artifacts cache.
         """
         if self._cancel(update, force):
             return
 
+        self._start = time()
+        self._force = force
+        self._paranoid = paranoid
+        self._cache = cache
         self._trusted = trusted
+        self._include = include
         self._set_output(output)
         if strip_components != 0:
             self._strip_components = strip_components
 
+        body = self._get(conditional=update and not force)
+        if body is None:
+            return
+
         # Perform operation sequentially to allow to revert back on error
-        dsts = self._extract()
+        self._load_dst_rows()
+        with body:
+            dsts = self._extract(body)
 
         for dst in dsts:
             dst.move()
@@ -392,16 +599,40 @@ class SrcBase(ABC):
 
         self._db_update(tsk_id, dsts)
 
-    def _extract(self):
+    def _extract(self, body):
         """
         Extract the file.
 
+        Args:
+            body (nun._src.Body): File content.
+
         Returns:
             list of nun._dst.Dst: destinations
         """
         raise NotImplementedError(f"extracting {self._name} is not supported.")
 
-    def install(self, force=False, update=False, tsk_id=None):
+    def _included(self, path):
+        """
+        Check if an archive member is selected for extraction.
+
+        Args:
+            path (str): Member path in the archive.
+
+        Returns:
+            bool: True if included.
+        """
+        include = self._include
+        if not include:
+            return True
+
+        strip_components = self._strip_components
+        if strip_components:
+            path = str(PurePath(*PurePath(path).parts[strip_components:]))
+        return any(fnmatch(path, pattern) for pattern in include)
+
+    def install(
+        self, force=False, update=False, tsk_id=None, paranoid=False, cache=True
+    ):
         """
         Install the file.
 
@@ -410,10 +641,17 @@ class SrcBase(ABC):
                 modified by user.
             update (bool): If True, is an update of an already in the database entry.
             tsk_id (int): Task ID.
+            paranoid (bool): If True, always hash existing destinations to detect
+                changes instead of trusting their stat attributes.
+            cache (bool): If True, use the downloaded artifacts cache.
         """
         if self._cancel(update, force):
             return
 
+        self._start = time()
+        self._force = force
+        self._paranoid = paranoid
+        self._cache = cache
         self._install()
         self._db_update(tsk_id)
 
@@ -423,20 +661,178 @@ class SrcBase(ABC):
         """
         raise NotImplementedError(f"Installing {self._name} is not supported.")
 
-    def _get(self):
+    def _get(self, conditional=False, offset=0, validator=None):
         """
         Performs a get request on file URL.
 
+        Identical downloads in the current task are performed once: Sources
+        requesting a content already being downloaded run once it is completed,
+        then read it from the cache if it was added to it, or perform their own
+        request.
+
+        Args:
+            conditional (bool): If True and the revision is not known in advance,
+                perform a conditional request based on the revision stored in the
+                database.
+            offset (int): If specified, request the content starting at this offset.
+                The server may ignore it and return the full content.
+            validator (str): Validator (ETag or Last-Modified header value) of the
+                content to request partially. Required with "offset".
+
         Returns:
-            file-like object: Response content.
+            nun._src.Body or nun._src.CachedBody or None: Response content, None if
+                not modified since the stored revision.
         """
+        flight = self._join_flight()
+        try:
+            body = self._request(conditional, offset, validator, flight)
+        except BaseException:
+            if flight is not None:
+                flight.set_done()
+            raise
+
+        # The download is completed, unless the body is read from the network
+        if flight is not None and not isinstance(body, Body):
+            flight.set_done(None if body is None else self._revision)
+        return body
+
+    def register_flight(self):
+        """
+        Register the download of this source in the current task, before its action
+        is scheduled.
+
+        Returns:
+            concurrent.futures.Future or None: Future completed once an identical
+                download, registered first, is completed. The action of this source
+                should be scheduled to run after it. None if this source performs
+                the download.
+        """
+        key = (self._url, self._revision)
+        with _FLIGHTS_LOCK:
+            try:
+                flight = _FLIGHTS[key]
+            except KeyError:
+                _FLIGHTS[key] = self._flight = _Flight(self)
+                return None
+        return None if flight.leader is self else flight.future
+
+    def _join_flight(self):
+        """
+        Join the identical download of the current task, or register this one.
+
+        If the identical download added a fresh artifact to the cache, its revision
+        is used to read the content from the cache. Else, this source performs its
+        own request.
+
+        Returns:
+            nun._src._Flight or None: Download to set completed once done. None if
+                an identical download was performed first.
+        """
+        if not self._cache:
+            return None
+
+        key = (self._url, self._revision)
+        with _FLIGHTS_LOCK:
+            try:
+                flight = _FLIGHTS[key]
+            except KeyError:
+                _FLIGHTS[key] = self._flight = flight = _Flight(self)
+        if flight.leader is self:
+            return flight
+
+        # Sources scheduled after the identical download never wait here
+        revision = flight.future.result()
+        if revision is not None:
+            self._revision = revision
+        return None
+
+    def _request(self, conditional=False, offset=0, validator=None, flight=None):
+        """
+        Performs a get request on file URL, or get the content from the cache.
+
+        Args:
+            conditional (bool): If True and the revision is not known in advance,
+                perform a conditional request based on the revision stored in the
+                database.
+            offset (int): If specified, request the content starting at this offset.
+                The server may ignore it and return the full content.
+            validator (str): Validator (ETag or Last-Modified header value) of the
+                content to request partially. Required with "offset".
+            flight (nun._src._Flight): Download to set completed once the content is
+                fully read from the network.
+
+        Returns:
+            nun._src.Body or nun._src.CachedBody or None: Response content, None if
+                not modified since the stored revision.
+        """
+        # Not modified since stored revision
+        if conditional and self._cancel(True, False):
+            return None
+
+        # Use the cached artifact if its revision is known to be the current one
+        cached = get_artifact(self._url, self._revision) if self._cache else None
+        if cached is not None and self._revision is not None:
+            body = self._open_cached(cached)
+            if body is not None:
+                return body
+            cached = None
+
+        # Perform a conditional request based on the revision stored in the database
+        # on update, or on the cached artifact revision
+        headers = dict()
+        validated = None
+        if self._revision is None:
+            if conditional and self._db_info is not None:
+                revision = self._db_info["revision"]
+            else:
+                revision = None
+
+            if revision:
+                headers = self._conditional_headers(revision)
+            elif cached is not None:
+                headers = self._conditional_headers(cached["revision"])
+                validated = cached
+
+        # Request the content end only if not modified since the validator
+        if offset and validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
         # Perform requests and handle exceptions
-        resp = self._session.get(self._url, stream=True)
+        resp = get_session().get(self._url, stream=True, headers=headers)
         resp.raise_for_status()
 
+        # Not modified since the cached artifact revision
+        if resp.status_code == 304 and validated is not None:
+            resp.close()
+            body = self._open_cached(validated)
+            if body is not None:
+                return body
+            return self._request(conditional, offset, validator, flight)
+
+        # Not modified since stored revision
+        elif resp.status_code == 304:
+            resp.close()
+            self._revision = self._db_info["revision"]
+            self._dst_ids = None
+            return None
+
         # Get information from headers
         headers = resp.headers
+        if self._revision is None:
+            self._revision = self._get_revision(headers)
         self._size = int(headers.get("Content-Length", 0))
+
+        # Partial content
+        if offset and resp.status_code == 206:
+            if not headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                # Unexpected range, request the full content instead
+                resp.close()
+                return self._request(conditional, flight=flight)
+            self._size += offset
+            self.add_size_callback(offset)
+        else:
+            offset = 0
         if self._mtime is None:
             try:
                 self._mtime = parse(headers["Last-Modified"]).timestamp()
@@ -449,8 +845,57 @@ class SrcBase(ABC):
         except KeyError:
             pass
 
-        # Return response body
-        return Body(resp, self)
+        # Return response body, and add it to the cache while read
+        return Body(
+            resp, self, offset, None if offset else self._new_artifact(), flight
+        )
+
+    def _open_cached(self, cached):
+        """
+        Open a cached artifact.
+
+        Args:
+            cached (dict): Cached artifact information.
+
+        Returns:
+            nun._src.CachedBody or None: Cached content, None if removed from cache
+                since its information was retrieved.
+        """
+        try:
+            file = open(cached["path"], "rb")
+        except FileNotFoundError:
+            return None
+
+        self._revision = revision = cached["revision"]
+        self._size = cached["size"]
+        self._name = cached["name"]
+        if self._mtime is None:
+            self._mtime = cached["mtime"]
+
+        headers = {"Content-Length": str(self._size)}
+        headers["ETag" if revision.startswith('"') else "Last-Modified"] = revision
+        return CachedBody(file, self, self._url, headers)
+
+    def _new_artifact(self):
+        """
+        Create a new artifact to add the content to the cache.
+
+        Returns:
+            nun._srg.Artifact or None: Artifact, None if the content cannot be
+                cached.
+        """
+        if not self._cache or self._revision is None:
+            return None
+        try:
+            return Artifact(
+                self._url,
+                self._revision,
+                name=self._name,
+                size=self._size,
+                mtime=self._mtime,
+            )
+        except OSError:
+            return None
 
     def _set_output(self, output):
         """
@@ -511,6 +956,60 @@ class SrcBase(ABC):
         return self._output
 
 
+class CompressedSrcBase(SrcBase):
+    """
+    Single compressed file source base.
+    """
+
+    def _extract(self, body):
+        """
+        Extract the file.
+
+        The content is decompressed while streamed into a single destination
+        named like the source without its compression extension.
+
+        Args:
+            body (nun._src.Body): File content.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        path = self._set_path(splitext(self._name)[0], strip_components=0)
+        dst = self._new_dst(path, mtime=self._mtime)
+        dst.write(decompress_stream(body))
+        return [dst]
+
+
+class _Flight:
+    """
+    Download performed once for identical sources of the current task.
+
+    Args:
+        leader (nun._src.SrcBase subclass): Source performing the download.
+    """
+
+    __slots__ = ("leader", "future")
+
+    def __init__(self, leader):
+        self.leader = leader
+        self.future = Future()
+
+    def set_done(self, revision=None):
+        """
+        Set the download completed. Only the first call has effect.
+
+        Args:
+            revision (str): Revision of the fresh artifact added to the cache by
+                the download. None if the download failed, or if its content was
+                not cached.
+        """
+        try:
+            self.future.set_result(revision)
+        except InvalidStateError:
+            # Already completed
+            pass
+
+
 class Body:
     """
     Body file like object
@@ -518,18 +1017,64 @@ class Body:
     Args:
         response (requests.Response): Response.
         src (nun._src.SrcBase subclass): Source.
+        offset (int): Offset of the response content in the full content.
+        artifact (nun._srg.Artifact): If specified, artifact where to write the
+            content to add it to the cache once fully read.
+        flight (nun._src._Flight): If specified, download to set completed once
+            closed.
     """
 
-    __slots__ = ("_response", "_add_size", "_read", "_src")
+    __slots__ = (
+        "_response",
+        "_add_size",
+        "_read",
+        "_src",
+        "_offset",
+        "_artifact",
+        "_flight",
+    )
 
-    def __init__(self, response, src):
+    def __init__(self, response, src, offset=0, artifact=None, flight=None):
         self._response = response
         self._src = src
+        self._offset = offset
+        self._artifact = artifact
+        self._flight = flight
 
         # Common functions
         self._add_size = src.add_size_callback
         self._read = self._response.raw.read
 
+    @property
+    def offset(self):
+        """
+        Offset of the body in the full content.
+
+        Returns:
+            int: Offset. 0 if the body is the full content.
+        """
+        return self._offset
+
+    @property
+    def url(self):
+        """
+        Response URL, after redirections.
+
+        Returns:
+            str: URL.
+        """
+        return self._response.url
+
+    @property
+    def headers(self):
+        """
+        Response headers.
+
+        Returns:
+            requests.structures.CaseInsensitiveDict: Headers.
+        """
+        return self._response.headers
+
     def read(self, size=-1):
         """
         Read body.
@@ -546,6 +1091,169 @@ class Body:
         # Update downloaded size
         self._add_size(len(chunk))
 
+        # Add to cache
+        artifact = self._artifact
+        if artifact is not None:
+            if chunk:
+                artifact.write(chunk)
+            else:
+                self._artifact = None
+                self.set_cached(self.commit(artifact))
+
+        return chunk
+
+    @staticmethod
+    def commit(artifact, digest=None):
+        """
+        Add the fully read content to the cache.
+
+        Args:
+            artifact (nun._srg.Artifact): Artifact.
+            digest (str): Content digest, required if the artifact file was
+                allocated.
+
+        Returns:
+            str or None: Revision of the cached artifact, None if not cached.
+        """
+        try:
+            if artifact.commit(digest):
+                return artifact.revision
+        except OSError:
+            artifact.discard()
+        return None
+
+    def set_cached(self, revision):
+        """
+        Set the content added to the cache, and allow identical downloads waiting
+        this one to read it from the cache.
+
+        Args:
+            revision (str or None): Revision of the cached artifact, None if not
+                cached.
+        """
+        if self._flight is not None:
+            self._flight.set_done(revision)
+
+    def tell(self):
+        """
+        Return current read position.
+
+        Returns:
+            int: Position.
+        """
+        return self._src.size_done
+
+    def detach_artifact(self):
+        """
+        Stop adding the content to the cache while read, to let the caller add it.
+
+        Returns:
+            nun._srg.Artifact or None: Artifact where the content was to be written,
+                None if the content is not added to the cache.
+        """
+        artifact = self._artifact
+        self._artifact = None
+        return artifact
+
+    def release(self):
+        """
+        Release the response connection, without reading the remaining content.
+
+        The body must not be read after this.
+        """
+        self._response.close()
+
+    def close(self):
+        """
+        Close the response and release its connection.
+
+        The content is not added to the cache if not fully read.
+        """
+        artifact = self._artifact
+        if artifact is not None:
+            self._artifact = None
+            artifact.discard()
+        self._response.close()
+
+        # Allow identical downloads waiting this one to continue, the content is
+        # not cached if not already done
+        if self._flight is not None:
+            self._flight.set_done()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Read the remaining of the content to add it to the cache
+        if exc_type is None and self._artifact is not None:
+            read = self.read
+            while read(BUFFER_SIZE):
+                continue
+        self.close()
+
+
+class CachedBody:
+    """
+    Cached body file like object
+
+    Args:
+        file (file-like object): Cached content.
+        src (nun._src.SrcBase subclass): Source.
+        url (str): Content URL.
+        headers (dict): Content headers.
+    """
+
+    __slots__ = ("_file", "_add_size", "_src", "_url", "_headers")
+
+    def __init__(self, file, src, url, headers):
+        self._file = file
+        self._src = src
+        self._url = url
+        self._headers = headers
+        self._add_size = src.add_size_callback
+
+    @property
+    def offset(self):
+        """
+        Offset of the body in the full content.
+
+        Returns:
+            int: Offset, always 0.
+        """
+        return 0
+
+    @property
+    def url(self):
+        """
+        Content URL.
+
+        Returns:
+            str: URL.
+        """
+        return self._url
+
+    @property
+    def headers(self):
+        """
+        Content headers.
+
+        Returns:
+            dict: Headers.
+        """
+        return self._headers
+
+    def read(self, size=-1):
+        """
+        Read body.
+
+        Args:
+            size (int):
+
+        Returns:
+            bytes: Read data.
+        """
+        chunk = self._file.read(size)
+        self._add_size(len(chunk))
         return chunk
 
     def tell(self):
@@ -556,3 +1264,153 @@ class Body:
             int: Position.
         """
         return self._src.size_done
+
+    def close(self):
+        """
+        Close the cached content.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Stream:
+    """
+    Buffered stream.
+
+    Reads never return more than the requested size, even if the underlying file
+    object does. Read data can be put back to read it again.
+
+    Reads raise EOFError if the content is truncated, callers may raise a more
+    specific exception.
+
+    Args:
+        fileobj (file-like object): Content.
+    """
+
+    __slots__ = ("_read", "_buffer", "_position")
+
+    def __init__(self, fileobj):
+        self._read = fileobj.read
+        self._buffer = b""
+        self._position = 0
+
+    def tell(self):
+        """
+        Return current read position.
+
+        Returns:
+            int: Position.
+        """
+        return self._position
+
+    def read(self, size=-1):
+        """
+        Read data.
+
+        Args:
+            size (int): Maximum size to read.
+
+        Returns:
+            bytes: Read data.
+        """
+        if size == -1:
+            size = BUFFER_SIZE
+
+        data = self._buffer or self._read(size)
+        self._buffer = data[size:]
+        data = data[:size]
+        self._position += len(data)
+        return data
+
+    def read_exact(self, size):
+        """
+        Read exactly the specified size.
+
+        Args:
+            size (int): Size to read.
+
+        Returns:
+            bytes: Read data.
+        """
+        data = self.read(size)
+        while len(data) < size:
+            chunk = self.read(size - len(data))
+            if not chunk:
+                raise EOFError("Content is truncated.")
+            data += chunk
+        return data
+
+    def skip(self, size):
+        """
+        Skip the specified size.
+
+        Args:
+            size (int): Size to skip.
+        """
+        read = self.read
+        while size:
+            chunk = read(min(size, BUFFER_SIZE))
+            if not chunk:
+                raise EOFError("Content is truncated.")
+            size -= len(chunk)
+
+    def unread(self, data):
+        """
+        Put back data to read.
+
+        Args:
+            data (bytes): Data.
+        """
+        self._buffer = data + self._buffer
+        self._position -= len(data)
+
+
+class StreamPart:
+    """
+    Part of a stream with a known size.
+
+    Args:
+        stream (nun._src.Stream): Stream.
+        size (int): Part size.
+    """
+
+    __slots__ = ("_stream", "_remaining")
+
+    def __init__(self, stream, size):
+        self._stream = stream
+        self._remaining = size
+
+    def read(self, size=-1):
+        """
+        Read data.
+
+        Args:
+            size (int): Maximum size to read. If -1, read until the part end.
+
+        Returns:
+            bytes: Read data, empty when the part end is reached.
+        """
+        remaining = self._remaining
+        if size == -1:
+            data = self._stream.read_exact(remaining)
+        elif not remaining:
+            return b""
+        else:
+            data = self._stream.read(min(size, remaining))
+            if not data:
+                raise EOFError("Content is truncated.")
+
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        """
+        Skip the remaining of the part.
+        """
+        self._stream.skip(self._remaining)
+        self._remaining = 0
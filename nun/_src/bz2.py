@@ -0,0 +1,7 @@
+"""Bzip2 compressed files"""
+
+from nun._src import CompressedSrcBase
+
+
+class Src(CompressedSrcBase):
+    """Bzip2 compressed files"""
@@ -0,0 +1,47 @@
+"""Debian packages"""
+
+from nun.exceptions import InvalidException
+from nun._src import Stream, StreamPart
+from nun._src.tar import Src as SrcTar
+
+# "ar" archive global header
+_AR_MAGIC = b"!<arch>\n"
+
+# "ar" archive member header size, and position of the member size in it
+_AR_HEADER_SIZE = 60
+_AR_SIZE = slice(48, 58)
+
+
+class Src(SrcTar):
+    """Debian packages"""
+
+    def _extract(self, body):
+        """
+        Extract the file.
+
+        The "ar" archive is read while streamed, up to its "data.tar" member that
+        is extracted like a tar archive.
+
+        Args:
+            body (nun._src.Body): File content.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        stream = Stream(body)
+        if stream.read_exact(len(_AR_MAGIC)) != _AR_MAGIC:
+            raise InvalidException(f'"{self._name}" is not a Debian package.')
+
+        while True:
+            try:
+                header = stream.read_exact(_AR_HEADER_SIZE)
+            except EOFError:
+                raise InvalidException(f'No data archive found in "{self._name}".')
+
+            name = header[:16].decode().rstrip(" /")
+            size = int(header[_AR_SIZE])
+            if name.startswith("data.tar"):
+                return super()._extract(StreamPart(stream, size))
+
+            # Skip other members, members data are aligned on 2 bytes
+            stream.skip(size + size % 2)
@@ -0,0 +1,7 @@
+"""Gzip compressed files"""
+
+from nun._src import CompressedSrcBase
+
+
+class Src(CompressedSrcBase):
+    """Gzip compressed files"""
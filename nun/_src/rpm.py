@@ -0,0 +1,174 @@
+"""RPM packages"""
+
+from posixpath import dirname, relpath
+from stat import S_ISDIR, S_ISLNK, S_ISREG
+from struct import Struct
+
+from nun.exceptions import InvalidException
+from nun._cmp import Decompressed
+from nun._src import Stream, StreamPart
+from nun._src.tar import Src as SrcTar
+
+# Lead
+_LEAD_MAGIC = b"\xed\xab\xee\xdb"
+_LEAD_SIZE = 96
+
+# Headers structures (Signature header and header)
+_HEADER_MAGIC = b"\x8e\xad\xe8"
+_HEADER = Struct(">3sB4xII")
+_INDEX = Struct(">IIII")
+_STRING_TYPE = 6
+
+# Header tags
+_TAG_PAYLOADFORMAT = 1124
+_TAG_PAYLOADCOMPRESSOR = 1125
+
+# Payload compressors names
+_COMPRESSORS = {
+    "gzip": "gz",
+    "bzip2": "bz2",
+    "xz": "xz",
+    "lzma": "lzma",
+    "zstd": "zst",
+    "identity": None,
+}
+
+# "newc" cpio archive
+_CPIO_MAGICS = (b"070701", b"070702")
+_CPIO_HEADER_SIZE = 110
+_CPIO_TRAILER = "TRAILER!!!"
+
+
+class Src(SrcTar):
+    """RPM packages"""
+
+    def _extract(self, body):
+        """
+        Extract the file.
+
+        The package headers are read while streamed, then its cpio payload is
+        decompressed and extracted.
+
+        Args:
+            body (nun._src.Body): File content.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        stream = Stream(body)
+        if not stream.read_exact(_LEAD_SIZE).startswith(_LEAD_MAGIC):
+            raise InvalidException(f'"{self._name}" is not a RPM package.')
+
+        # Signature header, padded to 8 bytes
+        size = _read_header(stream)[1]
+        stream.skip(-size % 8)
+
+        # Header
+        tags = _read_header(stream)[0]
+        payload_format = tags.get(_TAG_PAYLOADFORMAT, "cpio")
+        if payload_format != "cpio":
+            raise NotImplementedError(
+                f'"{payload_format}" payload of "{self._name}" is not supported.'
+            )
+        compressor = tags.get(_TAG_PAYLOADCOMPRESSOR, "gzip")
+        try:
+            compression = _COMPRESSORS[compressor]
+        except KeyError:
+            raise NotImplementedError(
+                f'"{compressor}" compressed payload of "{self._name}" is not '
+                "supported."
+            )
+
+        return self._extract_members(
+            _cpio_members(Stream(Decompressed(stream, compression)))
+        )
+
+
+def _read_header(stream):
+    """
+    Read a RPM header.
+
+    Args:
+        stream (nun._src.Stream): Package stream.
+
+    Returns:
+        tuple: String tags values (dict), header size (int).
+    """
+    magic, _, count, size = _HEADER.unpack(stream.read_exact(_HEADER.size))
+    if magic != _HEADER_MAGIC:
+        raise InvalidException("Invalid RPM header.")
+
+    index = stream.read_exact(count * _INDEX.size)
+    store = stream.read_exact(size)
+
+    tags = dict()
+    for tag, tag_type, offset, _ in _INDEX.iter_unpack(index):
+        if tag_type == _STRING_TYPE:
+            tags[tag] = store[offset : store.index(b"\0", offset)].decode()
+    return tags, _HEADER.size + len(index) + size
+
+
+def _cpio_members(stream):
+    """
+    "newc" cpio archive members.
+
+    Args:
+        stream (nun._src.Stream): Archive stream.
+
+    Returns:
+        generator of tuple: Member name, type, modification timestamp, size and data.
+    """
+    # Hard links content is only stored with the last link
+    hard_links = dict()
+
+    while True:
+        header = stream.read_exact(_CPIO_HEADER_SIZE)
+        if header[:6] not in _CPIO_MAGICS:
+            raise InvalidException("Unsupported cpio archive format.")
+        (
+            inode,
+            mode,
+            _,
+            _,
+            links,
+            mtime,
+            size,
+            major,
+            minor,
+            _,
+            _,
+            name_size,
+            _,
+        ) = (int(header[index : index + 8], 16) for index in range(6, 110, 8))
+
+        # Name, padded to 4 bytes with the header
+        name = stream.read_exact(name_size)[:-1].decode()
+        stream.skip(-(_CPIO_HEADER_SIZE + name_size) % 4)
+        if name == _CPIO_TRAILER:
+            return
+
+        if S_ISDIR(mode):
+            yield name, "dir", mtime, 0, None
+
+        elif S_ISLNK(mode):
+            yield name, "link", mtime, 0, stream.read_exact(size).decode()
+
+        elif S_ISREG(mode):
+            key = (major, minor, inode)
+            if links > 1 and not size:
+                hard_links.setdefault(key, []).append(name)
+                continue
+
+            data = StreamPart(stream, size)
+            yield name, "file", mtime, size, data
+            data.close()
+
+            for link in hard_links.pop(key, ()):
+                yield link, "link", mtime, 0, relpath(name, dirname(link))
+
+        # Other files types are not supported
+        else:
+            stream.skip(size)
+
+        # Data, padded to 4 bytes
+        stream.skip(-size % 4)
@@ -1,65 +1,236 @@
 """Tar archives"""
 
+from concurrent.futures import Future, wait
+from threading import Condition, Event
 import tarfile
 
-from nun._dst import Dst
 from nun.exceptions import CancelException
+from nun._cmp import decompress_stream
 from nun._src import SrcBase
+from nun._wrk import get_executor
 
 
 _TYPES = {tarfile.LNKTYPE: "link", tarfile.SYMTYPE: "link", tarfile.DIRTYPE: "dir"}
 
+# Maximum size of members content read in memory, but not yet written
+_MEMORY = 67108864
+
+# Members larger than this size are written directly by the reading thread
+_INLINE_SIZE = 8388608
+
+# Maximum size and number of members written together by a writing thread
+_BATCH_SIZE = 1048576
+_BATCH_MEMBERS = 64
+
 
 class Src(SrcBase):
     """Tar archives"""
 
-    def _extract(self):
+    def _extract(self, body):
         """
         Extract the file.
 
+        The compression format is detected from the content, accelerated
+        decompressors are used when available.
+
+        Args:
+            body (nun._src.Body): File content.
+
         Returns:
             list of nun._dst.Dst: destinations
         """
         # TODO: handle
         #  - mode, uname (or uid if absent), gname ( or gid if absent)
         #  - handle tarfile.TarError
+        with tarfile.open(fileobj=decompress_stream(body), mode="r|") as archive:
+            return self._extract_members(_tar_members(archive))
 
-        with tarfile.open(fileobj=self._get()) as archive:
-            dsts = []
-            extractfile = archive.extractfile
-            append_dst = dsts.append
+    def _extract_members(self, members):
+        """
+        Extract archive members.
+
+        Members are read by the current thread, while they are written by a pool
+        of threads. Small members are written by batches.
+
+        Args:
+            members (iterable of tuple): Members name, type, modification
+                timestamp, size and data. For files, data is a file-like object
+                that must be read before getting the next member. For links, data
+                is the link target. For directories, data is None.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        budget = _Budget(_MEMORY)
+        failed = Event()
+        results = []
+        add_result = results.append
+
+        submit = get_executor("disk").submit
+        try:
             set_path = self._set_path
-            next_member = archive.next
-            get_type = _TYPES.get
+            included = self._included
+            write_batch = self._write_batch
 
-            while True:
-                member = next_member()
-                if member is None:
-                    break
+            def submit_batch():
+                """Submit the current batch to writing threads"""
+                future = submit(write_batch, batch, batch_size, budget)
+                future.add_done_callback(lambda done: done.exception() and failed.set())
+                add_result(future)
+
+            batch = []
+            batch_size = 0
 
-                path = set_path(member.name)
-                member_type = get_type(member.type, "file")
-
-                try:
-                    dst = Dst(
-                        path,
-                        mtime=member.mtime,
-                        dst_type=member_type,
-                        res_id=self._res_id,
-                    )
-
-                    if member_type == "file":
-                        data = extractfile(member)
-                    elif member_type == "link":
-                        data = member.linkname
-                    else:
-                        data = None
-
-                    dst.write(data)
-                    dst.close()
-                    append_dst(dst)
-                except CancelException:
-                    # TODO: Log error messages at the higher level
+            for name, member_type, mtime, size, data in members:
+                if failed.is_set():
+                    break
+                elif not included(name):
                     continue
 
+                path = set_path(name)
+
+                if member_type == "file":
+                    # Large file: Write it directly without keeping it in memory
+                    if size > _INLINE_SIZE:
+                        if batch:
+                            submit_batch()
+                            batch = []
+                            batch_size = 0
+                        add_result(self._write_member(path, mtime, member_type, data))
+                        continue
+
+                    budget.acquire(size)
+                    batch_size += size
+                    data = data.read()
+
+                batch.append((path, mtime, member_type, data))
+                if batch_size >= _BATCH_SIZE or len(batch) >= _BATCH_MEMBERS:
+                    submit_batch()
+                    batch = []
+                    batch_size = 0
+
+            if batch:
+                submit_batch()
+
+        finally:
+            # Wait for writing threads, including on failure
+            wait([result for result in results if isinstance(result, Future)])
+
+        # Merge destinations in archive order
+        dsts = []
+        add_dst = dsts.append
+        extend_dsts = dsts.extend
+        for result in results:
+            if isinstance(result, Future):
+                extend_dsts(result.result())
+            elif result is not None:
+                add_dst(result)
         return dsts
+
+    def _write_batch(self, batch, size, budget):
+        """
+        Write a batch of members.
+
+        Args:
+            batch (list of tuple): Members path, modification time, type and data.
+            size (int): Size of members content in memory.
+            budget (nun._src.tar._Budget): Memory budget to release once written.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        try:
+            write_member = self._write_member
+            dsts = []
+            add_dst = dsts.append
+            for path, mtime, member_type, data in batch:
+                dst = write_member(path, mtime, member_type, data)
+                if dst is not None:
+                    add_dst(dst)
+            return dsts
+        finally:
+            budget.release(size)
+
+    def _write_member(self, path, mtime, member_type, data):
+        """
+        Write a member.
+
+        Args:
+            path (str): Destination path.
+            mtime (int): Modification timestamp.
+            member_type (str): Destination type.
+            data (file-like object or bytes-like object or str or None): Member
+                content, link target or None for directories.
+
+        Returns:
+            nun._dst.Dst or None: Destination, None if cancelled.
+        """
+        try:
+            dst = self._new_dst(path, mtime=mtime, dst_type=member_type)
+            dst.write(data)
+            dst.close()
+            return dst
+
+        except CancelException:
+            # TODO: Log error messages at the higher level
+            return None
+
+
+def _tar_members(archive):
+    """
+    Tar archive members.
+
+    Args:
+        archive (tarfile.TarFile): Archive.
+
+    Returns:
+        generator of tuple: Member name, type, modification timestamp, size and data.
+    """
+    extractfile = archive.extractfile
+    get_type = _TYPES.get
+    for member in archive:
+        member_type = get_type(member.type, "file")
+        if member_type == "file":
+            data = extractfile(member)
+        elif member_type == "link":
+            data = member.linkname
+        else:
+            data = None
+        yield member.name, member_type, member.mtime, member.size, data
+
+
+class _Budget:
+    """
+    Memory budget.
+
+    Args:
+        size (int): Budget size in bytes.
+    """
+
+    __slots__ = ("_available", "_condition")
+
+    def __init__(self, size):
+        self._available = size
+        self._condition = Condition()
+
+    def acquire(self, size):
+        """
+        Wait until the size is available and reserve it.
+
+        Args:
+            size (int): Size in bytes.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._available >= size)
+            self._available -= size
+
+    def release(self, size):
+        """
+        Release a reserved size.
+
+        Args:
+            size (int): Size in bytes.
+        """
+        with self._condition:
+            self._available += size
+            self._condition.notify_all()
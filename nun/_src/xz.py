@@ -0,0 +1,7 @@
+"""XZ compressed files"""
+
+from nun._src import CompressedSrcBase
+
+
+class Src(CompressedSrcBase):
+    """XZ compressed files"""
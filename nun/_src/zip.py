@@ -1,61 +1,497 @@
 """Zip archives"""
 
-from os.path import join
-from shutil import copyfileobj
-from tempfile import TemporaryDirectory
+from bz2 import BZ2Decompressor
+from concurrent.futures import wait
 from datetime import datetime
+from os import remove
+from shutil import copyfileobj
+from struct import Struct
+from tempfile import mkstemp
+from zlib import decompressobj, crc32, MAX_WBITS
 import zipfile
 
-from nun._dst import Dst
+from nun._dst import BUFFER_SIZE
 from nun.exceptions import CancelException
-from nun._src import SrcBase
+from nun._net import RangeFile, accept_ranges
+from nun._src import SrcBase, Stream
+from nun._wrk import WORKERS, get_executor
+
+# Minimum archive size to fetch only selected members with range requests
+_RANGES_SIZE = 8388608
+
+# Minimum number of members per thread to extract a local archive in parallel
+_WORKER_MEMBERS = 32
+
+# Zip records signatures
+_LOCAL_SIG = b"PK\x03\x04"
+_CENTRAL_SIG = b"PK\x01\x02"
+_DESCRIPTOR_SIG = b"PK\x07\x08"
+_END_SIGS = (b"PK\x05\x06", b"PK\x06\x06")
+
+# Zip records structures (Excluding signatures)
+_LOCAL = Struct("<HHHHHIIIHH")
+_CENTRAL = Struct("<HHHHHHIIIHHHHHII")
+_DESCRIPTOR = Struct("<III")
+_DESCRIPTOR64 = Struct("<IQQ")
+_EXTRA = Struct("<HH")
+_ZIP64_EXTRA_ID = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+# Zip flags
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+# Compression methods that can be streamed
+_DECOMPRESSORS = {
+    zipfile.ZIP_STORED: None,
+    zipfile.ZIP_DEFLATED: lambda: decompressobj(-MAX_WBITS),
+    zipfile.ZIP_BZIP2: BZ2Decompressor,
+}
 
 
 class Src(SrcBase):
     """Zip archives"""
 
-    def _extract(self):
+    def _extract(self, body):
         """
         Extract the file.
 
+        The archive is extracted while streamed by reading members local headers.
+        If a member cannot be extracted this way, the remaining of the archive is
+        spooled to a temporary file to be extracted from it.
+
+        If only some members are selected, and the server supports it, only the
+        central directory and the selected members are requested by ranges.
+
+        Args:
+            body (nun._src.Body): File content.
+
         Returns:
             list of nun._dst.Dst: destinations
         """
         # TODO: handle
-        #  - handle zipfile.BadZipFile
         #  - external_attr
         #  - passwords
-        with TemporaryDirectory(prefix="nun_") as tmp:
-            # Use a temporary file, Zip cannot be directly streamed like Tar
-            tmp_zip = join(tmp, "z.zip")
-            with open(tmp_zip, "wb") as zip_file:
-                copyfileobj(self._get(), zip_file)
-
-            with zipfile.ZipFile(tmp_zip) as archive:
-                dsts = []
-                member_open = archive.open
-                append_dst = dsts.append
-                set_path = self._set_path
-
-                for member in archive.infolist():
-                    path = set_path(member.filename)
-                    member_type = "dir" if member.is_dir() else "file"
-
-                    mtime = datetime(*member.date_time).timestamp()
-                    try:
-                        dst = Dst(
-                            path, dst_type=member_type, mtime=mtime, res_id=self._res_id
-                        )
-
-                        if member_type == "file":
-                            data = member_open(member)
-                        else:
-                            data = None
-
-                        dst.write(data)
-                        dst.close()
+        headers = body.headers
+        if (
+            self._include
+            and not body.offset
+            and self._size >= _RANGES_SIZE
+            and accept_ranges(headers)
+        ):
+            body.close()
+            return self._extract_ranges(body.url, self._get_revision(headers))
+
+        try:
+            return self._extract_stream(Stream(body))
+        except EOFError:
+            raise zipfile.BadZipFile(f'"{self._name}" is truncated.')
+
+    def _extract_stream(self, stream):
+        """
+        Extract members from the archive stream, by reading their local headers.
+
+        Args:
+            stream (nun._src.Stream): Archive stream.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        dsts = []
+        append_dst = dsts.append
+        extract_member = self._extract_member
+        included = self._included
+        crcs = dict()
+
+        while True:
+            offset = stream.tell()
+            signature = stream.read(4)
+
+            # Member
+            if signature == _LOCAL_SIG:
+                header = stream.read_exact(_LOCAL.size)
+                member = _LocalMember(header, stream)
+                if not member.streamable:
+                    stream.unread(signature + header + member.raw_header)
+                    dsts.extend(self._extract_spooled(stream, offset))
+                    return dsts
+
+                if included(member.filename):
+                    dst = extract_member(member.filename, member, member.date_time)
+                    if dst is not None:
                         append_dst(dst)
-                    except CancelException:
-                        # TODO: Log error messages at the higher level
-                        continue
+                member.close()
+                crcs[member.filename] = member.crc
+
+            # Central directory: Check it matches extracted members
+            elif signature == _CENTRAL_SIG:
+                stream.unread(signature)
+                _check_central_directory(stream, crcs)
+                break
+
+            # Empty archive
+            elif signature in _END_SIGS:
+                break
+
+            # Not a regular zip file (For instance, a self-extracting archive)
+            elif offset == 0:
+                stream.unread(signature)
+                return self._extract_spooled(stream, offset)
+
+            else:
+                raise zipfile.BadZipFile(
+                    f'Unexpected data in "{self._name}" at offset {offset}.'
+                )
+
         return dsts
+
+    def _extract_spooled(self, stream, offset):
+        """
+        Spool the remaining of the archive to a temporary file and extract members
+        from it.
+
+        Args:
+            stream (nun._src.Stream): Archive stream.
+            offset (int): Offset of the current stream position in the archive.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        fd, path = mkstemp(prefix="nun_", suffix=".zip")
+        try:
+            with open(fd, "wb") as tmp_zip:
+                # Keep offsets of the archive, the already extracted part is left
+                # empty
+                tmp_zip.seek(offset)
+                copyfileobj(stream, tmp_zip)
+
+            return self._extract_local(path, offset)
+        finally:
+            remove(path)
+
+    def _extract_local(self, path, offset=0):
+        """
+        Extract members from a local archive.
+
+        Members are distributed over the CPU worker threads, each one with its own
+        archive handle.
+
+        Args:
+            path (str): Archive path.
+            offset (int): Members before this offset are already extracted.
+
+        Returns:
+            list of nun._dst.Dst: destinations, in archive order.
+        """
+        with zipfile.ZipFile(path) as archive:
+            members = self._select_members(archive, offset)
+
+            workers = min(WORKERS["cpu"], len(members) // _WORKER_MEMBERS)
+            if workers < 2:
+                dsts = self._extract_members(archive, members)
+                return [dst for dst in dsts if dst is not None]
+
+        submit = get_executor("cpu").submit
+        futures = [
+            submit(self._extract_part, path, members[worker::workers])
+            for worker in range(workers)
+        ]
+        wait(futures)
+        parts = [future.result() for future in futures]
+
+        # Merge destinations in archive order
+        dsts = []
+        append_dst = dsts.append
+        for index in range(len(members)):
+            dst = parts[index % workers][index // workers]
+            if dst is not None:
+                append_dst(dst)
+        return dsts
+
+    def _extract_part(self, path, members):
+        """
+        Extract a part of the members of a local archive.
+
+        Args:
+            path (str): Archive path.
+            members (list of zipfile.ZipInfo): Members to extract.
+
+        Returns:
+            list of nun._dst.Dst or None: destinations, None for cancelled members.
+        """
+        with zipfile.ZipFile(path) as archive:
+            return self._extract_members(archive, members)
+
+    def _extract_ranges(self, url, validator):
+        """
+        Extract selected members by requesting only required archive ranges.
+
+        Args:
+            url (str): Archive URL.
+            validator (str): Validator (ETag or Last-Modified header value) of the
+                archive.
+
+        Returns:
+            list of nun._dst.Dst: destinations
+        """
+        with RangeFile(
+            url, self._size, validator, self.add_size_callback
+        ) as fileobj, zipfile.ZipFile(fileobj) as archive:
+            dsts = self._extract_members(archive, self._select_members(archive))
+            return [dst for dst in dsts if dst is not None]
+
+    def _select_members(self, archive, offset=0):
+        """
+        Select members to extract from a seekable archive.
+
+        Args:
+            archive (zipfile.ZipFile): Archive.
+            offset (int): Members before this offset are already extracted.
+
+        Returns:
+            list of zipfile.ZipInfo: Members.
+        """
+        included = self._included
+        return [
+            member
+            for member in archive.infolist()
+            if member.header_offset >= offset and included(member.filename)
+        ]
+
+    def _extract_members(self, archive, members):
+        """
+        Extract members from a seekable archive.
+
+        Args:
+            archive (zipfile.ZipFile): Archive.
+            members (list of zipfile.ZipInfo): Members to extract.
+
+        Returns:
+            list of nun._dst.Dst or None: destinations, None for cancelled members.
+        """
+        member_open = archive.open
+        extract_member = self._extract_member
+        return [
+            extract_member(
+                member.filename,
+                member_open(member) if not member.is_dir() else None,
+                member.date_time,
+            )
+            for member in members
+        ]
+
+    def _extract_member(self, filename, data, date_time):
+        """
+        Extract a member.
+
+        Args:
+            filename (str): Member filename.
+            data (file-like object): Member content. Ignored for directories.
+            date_time (tuple): Member modification date and time.
+
+        Returns:
+            nun._dst.Dst or None: Destination, None if cancelled.
+        """
+        member_type = "dir" if filename.endswith("/") else "file"
+        try:
+            dst = self._new_dst(
+                self._set_path(filename),
+                dst_type=member_type,
+                mtime=datetime(*date_time).timestamp(),
+            )
+            dst.write(data if member_type == "file" else None)
+            dst.close()
+            return dst
+
+        except CancelException:
+            # TODO: Log error messages at the higher level
+            return None
+
+
+class _LocalMember:
+    """
+    Zip member streamed from its local header.
+
+    Args:
+        header (bytes): Local header, without signature.
+        stream (nun._src.Stream): Archive stream.
+    """
+
+    __slots__ = (
+        "filename",
+        "date_time",
+        "crc",
+        "raw_header",
+        "streamable",
+        "_stream",
+        "_flags",
+        "_expected_crc",
+        "_remaining",
+        "_size",
+        "_decompressor",
+        "_zip64",
+        "_eof",
+    )
+
+    def __init__(self, header, stream):
+        (
+            _,
+            self._flags,
+            method,
+            mtime,
+            mdate,
+            self._expected_crc,
+            compress_size,
+            file_size,
+            filename_size,
+            extra_size,
+        ) = _LOCAL.unpack(header)
+        self._stream = stream
+        self.raw_header = stream.read_exact(filename_size + extra_size)
+        self.filename = self.raw_header[:filename_size].decode(
+            "utf-8" if self._flags & _FLAG_UTF8 else "cp437"
+        )
+        self.date_time = (
+            (mdate >> 9) + 1980,
+            (mdate >> 5) & 0xF,
+            mdate & 0x1F,
+            mtime >> 11,
+            (mtime >> 5) & 0x3F,
+            (mtime & 0x1F) * 2,
+        )
+        self.crc = 0
+        self._size = 0
+        self._eof = False
+
+        # Get sizes from Zip64 extra field
+        self._zip64 = False
+        extra = self.raw_header[filename_size:]
+        while len(extra) >= _EXTRA.size:
+            extra_id, size = _EXTRA.unpack(extra[: _EXTRA.size])
+            data = extra[_EXTRA.size : _EXTRA.size + size]
+            extra = extra[_EXTRA.size + size :]
+            if extra_id == _ZIP64_EXTRA_ID:
+                self._zip64 = True
+                sizes = [
+                    int.from_bytes(data[index : index + 8], "little")
+                    for index in range(0, len(data) - 7, 8)
+                ]
+                if file_size == _ZIP64_LIMIT and sizes:
+                    sizes.pop(0)
+                if compress_size == _ZIP64_LIMIT and sizes:
+                    compress_size = sizes.pop(0)
+
+        # Size is unknown if a data descriptor is used
+        if self._flags & _FLAG_DESCRIPTOR:
+            compress_size = None
+        self._remaining = compress_size
+
+        # Check if the member can be streamed
+        try:
+            decompressor = _DECOMPRESSORS[method]
+        except KeyError:
+            self.streamable = False
+        else:
+            self._decompressor = decompressor() if decompressor else None
+            self.streamable = not self._flags & _FLAG_ENCRYPTED and (
+                decompressor is not None or compress_size is not None
+            )
+
+    def read(self, size=-1):
+        """
+        Read member content.
+
+        Args:
+            size (int): Ignored, the size of returned data vary.
+
+        Returns:
+            bytes: Decompressed data, empty when the end of the member is reached.
+        """
+        stream = self._stream
+        decompressor = self._decompressor
+        while not self._eof:
+            remaining = self._remaining
+            if remaining == 0:
+                self._eof = True
+                break
+
+            data = stream.read(
+                BUFFER_SIZE if remaining is None else min(BUFFER_SIZE, remaining)
+            )
+            if not data:
+                raise zipfile.BadZipFile("Zip archive is truncated.")
+            if remaining is not None:
+                self._remaining -= len(data)
+
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+                if decompressor.eof:
+                    stream.unread(decompressor.unused_data)
+                    self._eof = True
+
+            if data:
+                self.crc = crc32(data, self.crc)
+                self._size += len(data)
+                return data
+
+        return b""
+
+    def close(self):
+        """
+        Read the remaining of the member and check its content.
+        """
+        while self.read():
+            continue
+
+        if self._flags & _FLAG_DESCRIPTOR:
+            stream = self._stream
+            descriptor = _DESCRIPTOR64 if self._zip64 else _DESCRIPTOR
+            data = stream.read_exact(4)
+            if data == _DESCRIPTOR_SIG:
+                data = b""
+            data += stream.read_exact(descriptor.size - len(data))
+            self._expected_crc, _, file_size = descriptor.unpack(data)
+            if file_size != self._size:
+                raise zipfile.BadZipFile(f'Bad size for file "{self.filename}"')
+
+        if self.crc != self._expected_crc:
+            raise zipfile.BadZipFile(f'Bad CRC-32 for file "{self.filename}"')
+
+
+def _check_central_directory(stream, crcs):
+    """
+    Check the central directory matches members extracted from local headers.
+
+    Args:
+        stream (nun._src.Stream): Archive stream, at the central directory
+            start.
+        crcs (dict): CRC-32 of extracted members per filename.
+    """
+    filenames = set()
+    add_filename = filenames.add
+    while stream.read(4) == _CENTRAL_SIG:
+        header = _CENTRAL.unpack(stream.read_exact(_CENTRAL.size))
+        flags, crc, filename_size, extra_size, comment_size = (
+            header[2],
+            header[6],
+            header[9],
+            header[10],
+            header[11],
+        )
+        filename = stream.read_exact(filename_size).decode(
+            "utf-8" if flags & _FLAG_UTF8 else "cp437"
+        )
+        stream.read_exact(extra_size + comment_size)
+
+        if crcs.get(filename) != crc:
+            raise zipfile.BadZipFile(
+                f'File "{filename}" from the central directory does not match the '
+                "extracted file."
+            )
+        add_filename(filename)
+
+    if filenames != crcs.keys():
+        raise zipfile.BadZipFile(
+            "Extracted files does not match the central directory."
+        )
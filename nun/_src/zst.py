@@ -0,0 +1,7 @@
+"""Zstandard compressed files"""
+
+from nun._src import CompressedSrcBase
+
+
+class Src(CompressedSrcBase):
+    """Zstandard compressed files"""
@@ -1,8 +1,10 @@
 """Local storage"""
 from hashlib import blake2b
 from json import load, loads, dump, dumps
-from os import listdir, utime, remove, chmod
-from os.path import join, getmtime
+from os import listdir, utime, remove, chmod, makedirs, replace, scandir, fdopen
+from os.path import join, getmtime, isdir
+from tempfile import mkstemp
+from threading import Lock
 from time import time
 
 from nun._cfg import CACHE_DIR, CONFIG_DIR, APP_NAME
@@ -11,6 +13,16 @@ _CACHE_LONG_EXPIRY = 172800
 _CACHE_SHORT_EXPIRY = 60
 _STORE_FILE = join(CONFIG_DIR, "store")
 
+# Downloaded artifacts cache
+_ARTIFACTS_DIR = join(CACHE_DIR, "artifacts")
+_ARTIFACTS_REFS_DIR = join(_ARTIFACTS_DIR, "refs")
+_ARTIFACTS_OBJECTS_DIR = join(_ARTIFACTS_DIR, "objects")
+_ARTIFACTS_LOCK = Lock()
+
+#: Maximum size of the downloaded artifacts cache, least recently used artifacts
+#: are removed when exceeded
+ARTIFACTS_SIZE = 4294967296
+
 
 def _hash_name(name):
     """
@@ -32,6 +44,10 @@ def clear_cache():
     expiry = _get_expiry()
     for cached_name in listdir(CACHE_DIR):
         path = join(CACHE_DIR, cached_name)
+        if isdir(path):
+            # Artifacts cache
+            continue
+
         if getmtime(path) < expiry[cached_name[-1]]:
             remove(path)
             continue
@@ -116,6 +132,171 @@ def set_cache(name, obj, long=False):
         file.write(dumps(obj))
 
 
+def get_artifact(url, revision=None):
+    """
+    Get a downloaded artifact from disk cache.
+
+    Args:
+        url (str): Artifact URL.
+        revision (str): Artifact revision. If not specified, return the last cached
+            revision.
+
+    Returns:
+        dict or None: Artifact information, with its cached file "path", None if
+            not cached.
+    """
+    ref_path = join(_ARTIFACTS_REFS_DIR, _hash_name(url))
+    try:
+        with open(ref_path, "rt") as file:
+            info = loads(file.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if revision is not None and info["revision"] != revision:
+        return None
+
+    # Mark as recently used, the file may have been removed if least recently used
+    info["path"] = path = join(_ARTIFACTS_OBJECTS_DIR, info["digest"])
+    try:
+        utime(path)
+    except FileNotFoundError:
+        return None
+    return info
+
+
+class Artifact:
+    """
+    Downloaded artifact to add to the disk cache.
+
+    Args:
+        url (str): Artifact URL.
+        revision (str): Artifact revision.
+        info (dict): Artifact information to store with it.
+    """
+
+    __slots__ = ("_url", "_info", "_path", "_file", "_hash_obj", "_size")
+
+    def __init__(self, url, revision, **info):
+        info["revision"] = revision
+        self._url = url
+        self._info = info
+        self._hash_obj = blake2b()
+        self._size = 0
+
+        makedirs(_ARTIFACTS_OBJECTS_DIR, exist_ok=True)
+        fd, self._path = mkstemp(prefix=".", dir=_ARTIFACTS_OBJECTS_DIR)
+        self._file = fdopen(fd, "wb")
+
+    def write(self, data):
+        """
+        Write artifact content.
+
+        Args:
+            data (bytes-like object): Data.
+        """
+        self._hash_obj.update(data)
+        self._file.write(data)
+        self._size += len(data)
+
+    def allocate(self, size):
+        """
+        Allocate the artifact file to let its content be written directly in it by
+        another writer (For instance, a parallel download). The content digest must
+        then be passed to "commit".
+
+        Args:
+            size (int): Content size.
+
+        Returns:
+            str: Artifact file path.
+        """
+        self._file.truncate(size)
+        self._file.close()
+        self._hash_obj = None
+        self._size = size
+        return self._path
+
+    @property
+    def revision(self):
+        """
+        Artifact revision.
+
+        Returns:
+            str: Revision.
+        """
+        return self._info["revision"]
+
+    def commit(self, digest=None):
+        """
+        Add the artifact to the cache.
+
+        The artifact is discarded if its content is incomplete.
+
+        Args:
+            digest (str): Content digest, required if the artifact file was
+                allocated.
+
+        Returns:
+            bool: True if added to the cache.
+        """
+        info = self._info
+        if info.get("size") and info["size"] != self._size:
+            self.discard()
+            return False
+
+        self._file.close()
+        info["digest"] = digest = digest or self._hash_obj.hexdigest()
+        replace(self._path, join(_ARTIFACTS_OBJECTS_DIR, digest))
+
+        makedirs(_ARTIFACTS_REFS_DIR, exist_ok=True)
+        fd, ref_path = mkstemp(prefix=".", dir=_ARTIFACTS_REFS_DIR)
+        with fdopen(fd, "wt") as file:
+            file.write(dumps(info))
+        replace(ref_path, join(_ARTIFACTS_REFS_DIR, _hash_name(self._url)))
+
+        _evict_artifacts()
+        return True
+
+    def discard(self):
+        """
+        Discard the artifact.
+        """
+        self._file.close()
+        try:
+            remove(self._path)
+        except FileNotFoundError:
+            pass
+
+
+def _evict_artifacts():
+    """
+    Remove least recently used artifacts if the cache size exceeds its maximum.
+    """
+    expiry = _get_expiry()["l"]
+    with _ARTIFACTS_LOCK:
+        stats = dict()
+        for entry in scandir(_ARTIFACTS_OBJECTS_DIR):
+            stat = entry.stat()
+
+            # Artifact being written, or abandoned
+            if entry.name.startswith("."):
+                if stat.st_mtime < expiry:
+                    remove(entry.path)
+                continue
+
+            stats[entry.path] = stat
+
+        size = sum(stat.st_size for stat in stats.values())
+        for path in sorted(stats, key=lambda key: stats[key].st_mtime):
+            if size <= ARTIFACTS_SIZE:
+                break
+            try:
+                remove(path)
+            except FileNotFoundError:
+                continue
+            size -= stats[path].st_size
+
+
 def get_secret(name):
     """
     Get a secret from OS keyring.
@@ -1,11 +1,21 @@
 """
 Task
 """
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from json import loads
+from threading import Condition, Lock
+
 from nun._db import DB
+from nun._net import set_pool_size
+from nun._plt import get_plt
 from nun._ui import get_ui
 from nun._srg import clear_cache
+from nun._src import clear_flights
 from nun._res import Res
+from nun._wrk import WORKERS, get_executor
 
 
 class Tsk:
@@ -19,11 +29,24 @@ class Tsk:
         "_debug",
         "_tsk_id",
         "_force",
+        "_paranoid",
+        "_cache",
     )
 
-    def __init__(self, res_names, action, debug=False, force=False, **arguments):
+    def __init__(
+        self,
+        res_names,
+        action,
+        debug=False,
+        force=False,
+        paranoid=False,
+        cache=True,
+        **arguments,
+    ):
         self._debug = debug
         self._force = force
+        self._paranoid = paranoid
+        self._cache = cache
         self._tsk_id = DB.set_tsk()
         self._res_names = set(res_names)
         self._action = action
@@ -41,6 +64,8 @@ class Tsk:
         tsk_id = self._tsk_id
         action = self._action
         force = self._force
+        paranoid = self._paranoid
+        cache = self._cache
 
         # Get resources
         if action in ("update", "remove"):
@@ -51,7 +76,7 @@ class Tsk:
                     res_id=row["id"],
                     name=row["name"],
                     action=row["action"],
-                    arguments=row["arguments"],
+                    arguments=loads(row["arguments"] or "{}"),
                 )
                 for glob in self._res_names
                 for row in DB.get_res_by_glob(glob)
@@ -65,22 +90,275 @@ class Tsk:
                 for name in self._res_names
             )
 
+        # Check resources to update at once
+        if action == "update" and not force:
+            resources = list(resources)
+            unchanged = self._get_unchanged(resources)
+        else:
+            unchanged = set()
+
         # Perform action on each resource
         dsts = dict()  # TODO: use it to check for conflics while applying
-        futures = list()
-        add_future = futures.append
-        with ThreadPoolExecutor() as executor:
-            submit = executor.submit
+        set_pool_size(WORKERS["net"])
+        with DB.writer():
+            scheduler = _Scheduler()
+            schedule = scheduler.schedule
 
             for res in resources:
-                add_future(submit(res.apply, action, submit, force))
+                res.apply(
+                    action,
+                    schedule,
+                    force,
+                    paranoid,
+                    cache,
+                    unchanged=res.name in unchanged,
+                )
 
             # Wait for completion
-            for future in futures:
-                future.result()
+            scheduler.wait()
+
+    @staticmethod
+    def _get_unchanged(resources):
+        """
+        Get resources unchanged since their last update, checked at once per
+        platform.
+
+        Args:
+            resources (list of nun._res.Res): Resources.
+
+        Returns:
+            set of str: Names of unchanged resources.
+        """
+        platforms = dict()
+        for res in resources:
+            name = res.name
+            platforms.setdefault(get_plt(name), dict())[name] = res.src_revisions
+
+        unchanged = set()
+        for plt, revisions in platforms.items():
+            unchanged.update(plt.get_unchanged(revisions))
+        return unchanged
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         clear_cache()
+        clear_flights()
+
+        # Close connexions of the executor threads
+        DB.close()
+
+
+class _Scheduler:
+    """
+    Task graph scheduler.
+
+    Nodes are submitted to their executor only once all nodes they depend on are
+    completed, so no executor worker ever waits for another node.
+
+    Ready nodes are submitted by decreasing priority, without exceeding the number
+    of workers of their executor. With the expected duration as priority, the
+    longest nodes start first, and do not delay the task completion by starting
+    last.
+    """
+
+    __slots__ = ("_condition", "_pending", "_exceptions", "_ready", "_running")
+
+    def __init__(self):
+        self._condition = Condition()
+        self._pending = 0
+        self._exceptions = []
+        self._ready = dict()
+        self._running = dict()
+
+    def schedule(self, function, *args, after=(), pool="net", priority=0, **kwargs):
+        """
+        Schedule a node.
+
+        If a node it depends on fails, the node is not run and fails with the same
+        exception.
+
+        Args:
+            function (callable): Node function.
+            args: Function positional arguments.
+            after (iterable of concurrent.futures.Future): Futures of the nodes to
+                complete before running this node.
+            pool (str): Kind of work of the node, to select the executor running it
+                ("net", "disk", "cpu").
+            priority (int or float): Ready nodes with higher priority run first.
+                Nodes with the same priority run in scheduling order.
+            kwargs: Function keyword arguments.
+
+        Returns:
+            concurrent.futures.Future: Node future.
+        """
+        with self._condition:
+            self._pending += 1
+        node = _Node(
+            self._set_ready, partial(function, *args, **kwargs), after, pool, priority
+        )
+        node.future.add_done_callback(self._done_callback)
+        return node.future
+
+    def _set_ready(self, node):
+        """
+        Queue a node ready to run.
+
+        Args:
+            node (nun._tsk._Node): Node.
+        """
+        pool = node.pool
+        with self._condition:
+            heappush(
+                self._ready.setdefault(pool, []), (-node.priority, node.index, node)
+            )
+        self._submit(pool)
+
+    def _submit(self, pool):
+        """
+        Submit ready nodes to the executor, by decreasing priority.
+
+        Args:
+            pool (str): Kind of work.
+        """
+        nodes = []
+        with self._condition:
+            ready = self._ready.get(pool)
+            running = self._running.get(pool, 0)
+            while ready and running < WORKERS[pool]:
+                nodes.append(heappop(ready)[2])
+                running += 1
+            self._running[pool] = running
+
+        submit = get_executor(pool).submit
+        for node in nodes:
+            submit(self._run, node)
+
+    def _run(self, node):
+        """
+        Run a node, then submit the next ready node.
+
+        Args:
+            node (nun._tsk._Node): Node.
+        """
+        try:
+            node.run()
+        finally:
+            pool = node.pool
+            with self._condition:
+                self._running[pool] -= 1
+            self._submit(pool)
+
+    def _done_callback(self, future):
+        """
+        Callback to set a node completed.
+
+        Args:
+            future (concurrent.futures.Future): Node future.
+        """
+        exception = future.exception()
+        with self._condition:
+            # Exceptions of failed nodes are propagated to nodes depending on them
+            if exception is not None and all(
+                exception is not other for other in self._exceptions
+            ):
+                self._exceptions.append(exception)
+
+            self._pending -= 1
+            if not self._pending:
+                self._condition.notify_all()
+
+    def wait(self):
+        """
+        Wait until all nodes, including nodes scheduled by other nodes, are
+        completed.
+
+        Raises the exception of the first failed node, if any.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self._pending)
+            if self._exceptions:
+                raise self._exceptions[0]
+
+
+class _Node:
+    """
+    Task graph node.
+
+    Args:
+        set_ready (function): Function to call with the node once ready to run.
+        function (callable): Node function.
+        after (iterable of concurrent.futures.Future): Futures of the nodes to
+            complete before running this node.
+        pool (str): Kind of work.
+        priority (int or float): Priority.
+    """
+
+    __slots__ = (
+        "future",
+        "pool",
+        "priority",
+        "index",
+        "_set_ready",
+        "_function",
+        "_waiting",
+        "_failed",
+        "_lock",
+    )
+
+    # Nodes creation order, to run nodes with the same priority in this order
+    _INDEXES = count()
+
+    def __init__(self, set_ready, function, after, pool, priority):
+        self.future = Future()
+        self.pool = pool
+        self.priority = priority
+        self.index = next(self._INDEXES)
+        self._set_ready = set_ready
+        self._function = function
+        self._failed = False
+        self._lock = Lock()
+
+        after = tuple(after)
+        self._waiting = len(after)
+        if not after:
+            set_ready(self)
+        for dependency in after:
+            dependency.add_done_callback(self._dependency_done_callback)
+
+    def _dependency_done_callback(self, dependency):
+        """
+        Callback to run the node once all nodes it depends on are completed.
+
+        Args:
+            dependency (concurrent.futures.Future): Completed node future.
+        """
+        exception = dependency.exception()
+        with self._lock:
+            self._waiting -= 1
+            if self._failed:
+                return
+            elif exception is not None:
+                self._failed = True
+            elif self._waiting:
+                return
+
+        if exception is not None:
+            self.future.set_exception(exception)
+        else:
+            self._set_ready(self)
+
+    def run(self):
+        """
+        Run the node.
+        """
+        future = self.future
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self._function()
+        except BaseException as exception:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -1,4 +1,5 @@
 """Console output"""
+from math import inf
 from shutil import get_terminal_size
 from time import time, sleep
 from sys import stdout, stderr
@@ -57,7 +58,7 @@ class Ui(UiBase):
 
         # Initialize progress bar
         bar_width = self._width - len(
-            "\r Progress: || 000% | 000.0 KB / 000.0 KB | 000.0 KB/s  "
+            "\r Progress: || 000% | 000.0 KB / 000.0 KB | 000.0 KB/s | 00:00:00  "
         )
         filled_width = 0
         percent = "?"
@@ -68,7 +69,7 @@ class Ui(UiBase):
         files_sized = set()
         size_offset = 0
         prev_size = 0
-        prev_time = time()
+        prev_time = start_time = time()
 
         # Initialize file completion information
         files_done = []
@@ -135,12 +136,17 @@ class Ui(UiBase):
                 rate = 0.0
             rate, rate_unit = self._get_unit(rate)
 
+            # Estimate remaining time
+            eta = self._get_eta(
+                files, size_done, full_size, approx, cur_time - start_time
+            )
+
             # Print progress information
             stdout.write(
                 f'\rProgress: |{"█" * filled_width}'
                 f'{"-" * (bar_width - filled_width)}| {percent:>3}% '
                 f"| {done:>5.1f} {done_unit:>2} / {total_formatted} "
-                f"| {rate:>5.1f} {rate_unit:>2}/s  "
+                f"| {rate:>5.1f} {rate_unit:>2}/s | {eta}  "
             )
 
             prev_size = size_done
@@ -148,3 +154,32 @@ class Ui(UiBase):
             sleep(0.2)
 
         self.info("Operation completed.")
+
+    @staticmethod
+    def _get_eta(files, size_done, full_size, approx, elapsed):
+        """
+        Estimate the remaining time.
+
+        Before any progress, or if the total size is unknown, the longest duration
+        of files operations in previous tasks is used.
+
+        Args:
+            files (list of nun._src.SrcBase subclass): Files in progress.
+            size_done (int): Processed size.
+            full_size (int): Total size.
+            approx (bool): True if the total size is an approximation.
+            elapsed (float): Elapsed time since the operation start.
+
+        Returns:
+            str: Remaining time, "??:??:??" if unknown.
+        """
+        if size_done and not approx:
+            eta = elapsed * (full_size - size_done) / size_done
+        else:
+            eta = max((file.expected_duration for file in files), default=inf) - elapsed
+
+        if eta == inf:
+            return "??:??:??"
+        minutes, seconds = divmod(max(int(eta), 0), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02}:{minutes:02}:{seconds:02}"
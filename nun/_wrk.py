@@ -0,0 +1,76 @@
+"""Workers"""
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
+from threading import Lock
+
+from nun._net import set_connections
+
+_CPUS = cpu_count() or 1
+
+#: Number of worker threads per kind of work: "net" for network requests and
+#: streamed extraction, "disk" for writing and removing files, "cpu" for
+#: extracting members of zip archives that cannot be streamed. Tar archives and
+#: compressed files are decompressed, and destinations hashed, by the threads
+#: reading them
+WORKERS = dict(net=min(32, _CPUS + 4), disk=min(16, _CPUS + 4), cpu=_CPUS)
+
+_LOCK = Lock()
+_EXECUTORS = dict()
+
+
+def set_workers(net=None, disk=None, cpu=None, connections=None, api_connections=None):
+    """
+    Set the number of worker threads and network connections.
+
+    Args:
+        net (int): Number of threads performing network requests and streamed
+            extraction.
+        disk (int): Number of threads writing files.
+        cpu (int): Number of threads extracting members of zip archives that
+            cannot be streamed. Other archives and compressed files are
+            decompressed by the network threads.
+        connections (int): Maximum number of connections in parallel to a same
+            download host. Default to the number of network threads.
+        api_connections (int): Maximum number of connections in parallel to the
+            platforms APIs.
+    """
+    with _LOCK:
+        for kind, size in (("net", net), ("disk", disk), ("cpu", cpu)):
+            if size is None:
+                continue
+            elif size < 1:
+                raise ValueError(f'The number of "{kind}" workers must be positive.')
+            WORKERS[kind] = size
+
+            # Replace the executor, pending jobs of the previous one are completed
+            executor = _EXECUTORS.pop(kind, None)
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    set_connections(connections, api_connections)
+
+
+def get_executor(kind):
+    """
+    Get the executor for a kind of work, shared by the whole process.
+
+    Jobs of an executor must never wait for other jobs of the same executor, to
+    ensure they cannot starve it.
+
+    Args:
+        kind (str): Kind of work ("net", "disk", "cpu").
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: Executor.
+    """
+    try:
+        return _EXECUTORS[kind]
+    except KeyError:
+        with _LOCK:
+            try:
+                return _EXECUTORS[kind]
+            except KeyError:
+                executor = _EXECUTORS[kind] = ThreadPoolExecutor(
+                    WORKERS[kind], thread_name_prefix=f"nun_{kind}"
+                )
+                return executor
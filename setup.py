@@ -47,6 +47,7 @@ PACKAGE_INFO = dict(
         "requests>=2.20.0",
         "python-dateutil>=2.6.0",
     ],
+    extras_require={"zstd": ["pyzstd"], "isal": ["isal"]},
     setup_requires=["setuptools"],
     tests_require=["pytest"],
     packages=find_packages(exclude=["docs", "tests"]),
@@ -0,0 +1,37 @@
+"""Tests configuration"""
+from io import BytesIO
+
+import pytest
+
+from nun._src import CachedBody, get_src
+
+
+@pytest.fixture
+def extract(tmp_path):
+    """
+    Extract a source content in a temporary directory, like
+    "nun._src.SrcBase.extract" but without network requests and database updates.
+
+    Returns:
+        function: Function with source name (str), content (bytes) and include
+            (iterable of str) arguments, returning the output directory
+            (pathlib.Path).
+    """
+    output = tmp_path / "output"
+    output.mkdir()
+
+    def extract_content(name, content, include=None):
+        src = get_src(name, f"https://example.org/{name}", "test://res", None)
+        src._set_output(output)
+        src._include = include
+        src._load_dst_rows()
+        with CachedBody(BytesIO(content), src, src._url, dict()) as body:
+            dsts = src._extract(body)
+
+        for dst in dsts:
+            dst.move()
+        for dst in dsts:
+            dst.clear()
+        return output
+
+    return extract_content
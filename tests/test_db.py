@@ -0,0 +1,101 @@
+"""Database tests"""
+from sqlite3 import connect
+from threading import Event, Thread
+from time import sleep
+
+import pytest
+
+from nun._cfg import APP_NAME
+from nun._db import _TABLES, _Database
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Database in a temporary directory"""
+    monkeypatch.setattr("nun._db.DATA_DIR", str(tmp_path))
+    database = _Database()
+    yield database
+    database.close()
+
+
+def _dst(path):
+    """Destination values"""
+    return dict(
+        path=path,
+        digest="digest",
+        st_mode=0o100644,
+        st_uid=0,
+        st_gid=0,
+        st_size=1,
+        st_mtime=1,
+        st_ctime=1,
+        st_ino=1,
+        st_dev=1,
+    )
+
+
+def test_migrate_duplicated_dst(tmp_path, monkeypatch):
+    """Duplicated destinations are removed before enforcing unique paths"""
+    # Create a database at version 0, without indexes
+    removed = {"dst": ("st_ino", "st_dev"), "src": ("duration",)}
+    connexion = connect(str(tmp_path / f"{APP_NAME}.sqlite"))
+    with connexion:
+        for table, columns in _TABLES.items():
+            columns = (col for col in columns if col[0] not in removed.get(table, ()))
+            connexion.execute(
+                f'CREATE TABLE {table}({", ".join(" ".join(col) for col in columns)})'
+            )
+        connexion.executemany(
+            "INSERT INTO dst(id, path, src_id) VALUES (?, ?, ?)",
+            ((1, "/a", 1), (2, "/b", 1), (3, "/a", 2)),
+        )
+    connexion.close()
+
+    monkeypatch.setattr("nun._db.DATA_DIR", str(tmp_path))
+    database = _Database()
+    try:
+        assert database.get_dst("/a")["id"] == 3
+        assert database.get_dst("/b")["id"] == 2
+        assert len(database.get_dst_by_src(1)) == 1
+    finally:
+        database.close()
+
+
+def test_set_src_dsts_same_path(database):
+    """Sources of a same task creating the same path do not conflict"""
+    tsk_id = database.set_tsk()
+    res_id = database.set_res(tsk_id, name="res", action=0)
+
+    first_id, first_dsts = database.set_src_dsts(
+        tsk_id, (_dst("/a"), _dst("/b")), res_id=res_id, name="first"
+    )
+    second_id, second_dsts = database.set_src_dsts(
+        tsk_id, (_dst("/a"),), res_id=res_id, name="second"
+    )
+
+    # The latest source written to the path owns its destination
+    assert second_dsts["/a"] == first_dsts["/a"]
+    assert database.get_dst("/a")["src_id"] == second_id
+    assert [row["path"] for row in database.get_dst_by_src(first_id)] == ["/b"]
+
+
+def test_writer_submit_on_exit(database):
+    """Operations submitted while the writer exits are all performed"""
+    futures = []
+    stop = Event()
+
+    def submit():
+        """Submit operations until stopped"""
+        while not stop.is_set():
+            futures.append(database.submit("set_tsk"))
+
+    threads = [Thread(target=submit) for _ in range(4)]
+    with database.writer():
+        for thread in threads:
+            thread.start()
+        sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(future.result(timeout=10) for future in futures)
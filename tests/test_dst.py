@@ -0,0 +1,139 @@
+"""Destinations tests"""
+from pathlib import Path
+
+import pytest
+
+from nun._dst import Dst, SPOOL_SIZE, _PRT_EXT, _RSM_EXT
+
+_URL = "https://example.org/file"
+_CONTENT = b"0123456789" * (SPOOL_SIZE // 5)
+
+
+def _interrupt(path, validator="v1"):
+    """
+    Interrupt a resumable write after its content is written to the part file.
+
+    Args:
+        path (str): Destination path.
+        validator (str): Content validator.
+    """
+    with pytest.raises(ConnectionError):
+        with Dst(path, None) as dst:
+            dst.set_resumable(_URL, validator)
+            dst.write(_CONTENT[: SPOOL_SIZE + 1])
+            raise ConnectionError()
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Destination path, with an interrupted write to resume"""
+    path = str(tmp_path / "file")
+    _interrupt(path)
+    assert (tmp_path / ("file" + _PRT_EXT)).is_file()
+    assert (tmp_path / ("file" + _RSM_EXT)).is_file()
+    return path
+
+
+def _leftovers(path):
+    """
+    Files left next to the destination.
+
+    Args:
+        path (str): Destination path.
+
+    Returns:
+        list of str: File names.
+    """
+    return sorted(
+        str(file.name) for file in Path(path).parent.iterdir() if file.name != "file"
+    )
+
+
+def test_resume(path):
+    """An interrupted write is resumed, then its resume information removed"""
+    with Dst(path, None) as dst:
+        offset, validator = dst.get_resume(_URL)
+        assert (offset, validator) == (SPOOL_SIZE + 1, "v1")
+        dst.resume(offset)
+        dst.set_resumable(_URL, validator)
+        dst.write(_CONTENT[offset:])
+        dst.close()
+        dst.move()
+
+    assert open(path, "rb").read() == _CONTENT
+    assert _leftovers(path) == []
+
+
+def test_retry_changed_url(path):
+    """Resume information is removed if the new content is not resumed"""
+    with Dst(path, None) as dst:
+        assert dst.get_resume("https://example.org/other") == (0, None)
+        dst.write(b"new")
+        dst.close()
+        dst.move()
+
+    assert open(path, "rb").read() == b"new"
+    assert _leftovers(path) == []
+
+
+def test_retry_changed_validator(path):
+    """Resume information is replaced if the new content validator changed"""
+    _interrupt(path, "v2")
+    with Dst(path, None) as dst:
+        assert dst.get_resume(_URL) == (SPOOL_SIZE + 1, "v2")
+
+
+def test_retry_failed(path):
+    """Resume information is removed if the resumed write fails early"""
+    with pytest.raises(ConnectionError):
+        with Dst(path, None) as dst:
+            dst.get_resume(_URL)
+            raise ConnectionError()
+
+    assert _leftovers(path) == []
+
+
+def test_retry_allocate(path):
+    """Resume information is removed if the part file is re-allocated"""
+    with Dst(path, None) as dst:
+        dst.get_resume(_URL)
+        with open(dst.allocate(3), "r+b") as file:
+            file.write(b"new")
+        assert _leftovers(path) == ["file" + _PRT_EXT]
+        dst.close()
+        dst.move()
+
+    assert open(path, "rb").read() == b"new"
+    assert _leftovers(path) == []
+
+
+def test_cancel_restore(tmp_path):
+    """Cancelling a moved destination restores its back up"""
+    path = str(tmp_path / "file")
+    with open(path, "wb") as file:
+        file.write(b"previous")
+
+    dst = Dst(path, None, force=True)
+    dst.write(b"new")
+    dst.close()
+    dst.move()
+    assert open(path, "rb").read() == b"new"
+
+    dst.cancel()
+    assert open(path, "rb").read() == b"previous"
+    assert _leftovers(path) == []
+
+
+def test_link(tmp_path):
+    """Symbolic links are moved in place, without changing their target"""
+    target = tmp_path / "target"
+    target.write_bytes(b"target")
+    path = str(tmp_path / "file")
+
+    dst = Dst(path, None, mtime=0, dst_type="link")
+    dst.write("target")
+    dst.close()
+    dst.move()
+
+    assert Path(path).is_symlink()
+    assert target.stat().st_mtime != 0
@@ -0,0 +1,29 @@
+"""Single compressed files tests"""
+from bz2 import compress as bz2_compress
+from gzip import compress as gzip_compress
+from lzma import compress as xz_compress
+
+import pytest
+
+_CONTENT = b"content" * 10000
+
+
+@pytest.mark.parametrize(
+    "name, compress",
+    (
+        ("file.txt.gz", gzip_compress),
+        ("file.txt.bz2", bz2_compress),
+        ("file.txt.xz", xz_compress),
+    ),
+)
+def test_extract(extract, name, compress):
+    """Files are decompressed to a destination named without the extension"""
+    output = extract(name, compress(_CONTENT))
+    assert [path.name for path in output.iterdir()] == ["file.txt"]
+    assert (output / "file.txt").read_bytes() == _CONTENT
+
+
+def test_extract_concatenated(extract):
+    """Concatenated gzip members are all decompressed"""
+    output = extract("file.gz", gzip_compress(b"first") + gzip_compress(b"second"))
+    assert (output / "file").read_bytes() == b"firstsecond"
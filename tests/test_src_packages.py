@@ -0,0 +1,210 @@
+"""Debian and RPM packages tests"""
+from gzip import compress as gzip_compress
+from io import BytesIO
+from lzma import compress as xz_compress
+from stat import S_IFDIR, S_IFLNK, S_IFREG
+from struct import pack
+import tarfile
+
+import pytest
+
+from nun.exceptions import InvalidException
+
+
+def _tar(members):
+    """
+    Create a tar archive.
+
+    Args:
+        members (iterable of tuple): Members name and content, or link target for
+            symbolic links.
+
+    Returns:
+        bytes: Archive.
+    """
+    output = BytesIO()
+    with tarfile.open(fileobj=output, mode="w") as archive:
+        for name, content in members:
+            info = tarfile.TarInfo(name)
+            if isinstance(content, str):
+                info.type = tarfile.SYMTYPE
+                info.linkname = content
+                archive.addfile(info)
+            else:
+                info.size = len(content)
+                archive.addfile(info, BytesIO(content))
+    return output.getvalue()
+
+
+def _ar(members):
+    """
+    Create an "ar" archive.
+
+    Args:
+        members (iterable of tuple): Members name and content.
+
+    Returns:
+        bytes: Archive.
+    """
+    output = [b"!<arch>\n"]
+    for name, content in members:
+        size = len(content)
+        output.append(
+            f"{name + '/':<16}{0:<12}{0:<6}{0:<6}{100644:<8}{size:<10}`\n".encode()
+        )
+        output.append(content + b"\n" * (size % 2))
+    return b"".join(output)
+
+
+def _deb(data_name, data):
+    """
+    Create a Debian package.
+
+    Args:
+        data_name (str): Data archive name.
+        data (bytes): Data archive.
+
+    Returns:
+        bytes: Package.
+    """
+    return _ar(
+        (
+            ("debian-binary", b"2.0\n"),
+            ("control.tar.gz", gzip_compress(_tar((("./control", b"Package: a"),)))),
+            (data_name, data),
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "data_name, compress",
+    (("data.tar.xz", xz_compress), ("data.tar.gz", gzip_compress)),
+)
+def test_extract_deb(extract, data_name, compress):
+    """Debian packages data archive is extracted"""
+    output = extract(
+        "package.deb",
+        _deb(
+            data_name,
+            compress(
+                _tar(
+                    (
+                        ("./usr/bin/a", b"a" * 1001),
+                        ("./usr/bin/b", "a"),
+                    )
+                )
+            ),
+        ),
+    )
+    assert (output / "usr/bin/a").read_bytes() == b"a" * 1001
+    assert (output / "usr/bin/b").is_symlink()
+    assert (output / "usr/bin/b").read_bytes() == b"a" * 1001
+    assert not (output / "control").exists()
+
+
+def test_extract_deb_no_data(extract):
+    """Debian packages without data archive are invalid"""
+    with pytest.raises(InvalidException):
+        extract("package.deb", _ar((("debian-binary", b"2.0\n"),)))
+
+
+def _rpm_header(tags):
+    """
+    Create a RPM header with string tags.
+
+    Args:
+        tags (dict): String values per tag.
+
+    Returns:
+        bytes: Header.
+    """
+    index = []
+    store = b""
+    for tag, value in tags.items():
+        index.append(pack(">IIII", tag, 6, len(store), 1))
+        store += value.encode() + b"\0"
+    return (
+        pack(">3sB4xII", b"\x8e\xad\xe8", 1, len(index), len(store))
+        + b"".join(index)
+        + store
+    )
+
+
+def _cpio(members):
+    """
+    Create a "newc" cpio archive.
+
+    Args:
+        members (iterable of tuple): Members name, mode, inode, number of links
+            and content.
+
+    Returns:
+        bytes: Archive.
+    """
+    output = []
+    members = list(members) + [("TRAILER!!!", 0, 0, 1, b"")]
+    for name, mode, inode, links, content in members:
+        name = name.encode() + b"\0"
+        fields = (inode, mode, 0, 0, links, 0, len(content), 0, 0, 0, 0, len(name), 0)
+        header = b"070701" + b"".join(b"%08x" % field for field in fields) + name
+        output.append(header + b"\0" * (-len(header) % 4))
+        output.append(content + b"\0" * (-len(content) % 4))
+    return b"".join(output)
+
+
+def _rpm(payload, compressor):
+    """
+    Create a RPM package.
+
+    Args:
+        payload (bytes): Compressed cpio archive.
+        compressor (str): Payload compressor name.
+
+    Returns:
+        bytes: Package.
+    """
+    signature = _rpm_header({1000: "signature"})
+    return (
+        b"\xed\xab\xee\xdb"
+        + b"\0" * 92
+        + signature
+        + b"\0" * (-len(signature) % 8)
+        + _rpm_header({1124: "cpio", 1125: compressor})
+        + payload
+    )
+
+
+@pytest.mark.parametrize(
+    "compressor, compress", (("xz", xz_compress), ("gzip", gzip_compress))
+)
+def test_extract_rpm(extract, compressor, compress):
+    """RPM packages payload is extracted, with hard and symbolic links"""
+    output = extract(
+        "package.rpm",
+        _rpm(
+            compress(
+                _cpio(
+                    (
+                        ("./usr", S_IFDIR | 0o755, 1, 2, b""),
+                        ("./usr/bin/link", S_IFLNK | 0o777, 2, 1, b"a"),
+                        # Hard links: Content is stored with the last link only
+                        ("./usr/bin/hard", S_IFREG | 0o755, 3, 2, b""),
+                        ("./usr/bin/a", S_IFREG | 0o755, 3, 2, b"a" * 1001),
+                        ("./usr/bin/b", S_IFREG | 0o644, 4, 1, b"b" * 3),
+                    )
+                )
+            ),
+            compressor,
+        ),
+    )
+    assert (output / "usr/bin/a").read_bytes() == b"a" * 1001
+    assert (output / "usr/bin/b").read_bytes() == b"b" * 3
+    assert (output / "usr/bin/link").is_symlink()
+    assert (output / "usr/bin/link").read_bytes() == b"a" * 1001
+    assert (output / "usr/bin/hard").read_bytes() == b"a" * 1001
+
+
+def test_extract_rpm_invalid(extract):
+    """Files that are not RPM packages are invalid"""
+    with pytest.raises(InvalidException):
+        extract("package.rpm", b"\0" * 200)
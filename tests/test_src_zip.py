@@ -0,0 +1,105 @@
+"""Zip archives tests"""
+from io import BytesIO
+import zipfile
+
+import pytest
+
+
+class _Unseekable:
+    """Unseekable output, zip members are then written with data descriptors"""
+
+    def __init__(self):
+        self.buffer = BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+
+def _zip(members, seekable=True):
+    """
+    Create a zip archive.
+
+    Args:
+        members (iterable of tuple): Members name, content and compression method.
+        seekable (bool): If False, write members with data descriptors.
+
+    Returns:
+        bytes: Archive.
+    """
+    output = BytesIO() if seekable else _Unseekable()
+    with zipfile.ZipFile(output, "w") as archive:
+        for name, content, method in members:
+            archive.writestr(name, content, compress_type=method)
+    return (output if seekable else output.buffer).getvalue()
+
+
+def test_extract_streamed(extract):
+    """Members with known sizes are extracted while streamed"""
+    output = extract(
+        "archive.zip",
+        _zip(
+            (
+                ("dir/", b"", zipfile.ZIP_STORED),
+                ("dir/stored", b"stored" * 100, zipfile.ZIP_STORED),
+                ("dir/deflated", b"deflated" * 100, zipfile.ZIP_DEFLATED),
+                ("bzip2", b"bzip2" * 100, zipfile.ZIP_BZIP2),
+            )
+        ),
+    )
+    assert (output / "dir/stored").read_bytes() == b"stored" * 100
+    assert (output / "dir/deflated").read_bytes() == b"deflated" * 100
+    assert (output / "bzip2").read_bytes() == b"bzip2" * 100
+
+
+def test_extract_data_descriptor(extract):
+    """Members with data descriptors are extracted"""
+    output = extract(
+        "archive.zip",
+        _zip(
+            (
+                # Compressed: Streamed until the end of the compressed data
+                ("deflated", b"deflated" * 100, zipfile.ZIP_DEFLATED),
+                # Stored, the size is unknown: The remaining is spooled
+                ("stored", b"stored" * 100, zipfile.ZIP_STORED),
+                ("last", b"last", zipfile.ZIP_DEFLATED),
+            ),
+            seekable=False,
+        ),
+    )
+    assert (output / "deflated").read_bytes() == b"deflated" * 100
+    assert (output / "stored").read_bytes() == b"stored" * 100
+    assert (output / "last").read_bytes() == b"last"
+
+
+def test_extract_include(extract):
+    """Only included members are extracted"""
+    output = extract(
+        "archive.zip",
+        _zip(
+            (
+                ("a.txt", b"a", zipfile.ZIP_DEFLATED),
+                ("b.bin", b"b", zipfile.ZIP_DEFLATED),
+            ),
+            seekable=False,
+        ),
+        include=("*.txt",),
+    )
+    assert sorted(path.name for path in output.iterdir()) == ["a.txt"]
+
+
+def test_extract_bad_crc(extract):
+    """Corrupted members are detected"""
+    content = bytearray(_zip((("file", b"content", zipfile.ZIP_STORED),)))
+    content[content.index(b"content")] = ord("C")
+    with pytest.raises(zipfile.BadZipFile):
+        extract("archive.zip", bytes(content))
+
+
+def test_extract_truncated(extract):
+    """Truncated archives are detected"""
+    content = _zip((("file", b"content", zipfile.ZIP_STORED),))
+    with pytest.raises(zipfile.BadZipFile):
+        extract("archive.zip", content[:20])
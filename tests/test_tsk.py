@@ -0,0 +1,121 @@
+"""Task scheduler tests"""
+from threading import Event, Thread
+
+import pytest
+
+from nun._tsk import _Scheduler
+from nun._wrk import WORKERS
+
+# Timeout to detect deadlocks, in seconds
+_TIMEOUT = 10
+
+
+def _wait(scheduler):
+    """
+    Wait for the scheduler completion without risking a deadlock of the tests.
+
+    Args:
+        scheduler (nun._tsk._Scheduler): Scheduler.
+
+    Returns:
+        BaseException or None: Exception raised by the scheduler.
+    """
+    result = []
+
+    def wait():
+        """Wait for the scheduler"""
+        try:
+            scheduler.wait()
+        except BaseException as exception:
+            result.append(exception)
+        else:
+            result.append(None)
+
+    thread = Thread(target=wait, daemon=True)
+    thread.start()
+    thread.join(_TIMEOUT)
+    assert not thread.is_alive(), "Scheduler deadlock"
+    return result[0]
+
+
+def _fail():
+    """Failing node"""
+    raise ValueError("failed")
+
+
+def test_failed_dependency():
+    """Nodes depending on a failed node fail without running nor deadlocking"""
+    scheduler = _Scheduler()
+    schedule = scheduler.schedule
+    ran = []
+
+    failed = schedule(_fail)
+    dependent = schedule(ran.append, "dependent", after=(failed,), pool="disk")
+    chained = schedule(ran.append, "chained", after=(dependent,))
+    independent = schedule(ran.append, "independent", pool="cpu")
+    joined = schedule(ran.append, "joined", after=(independent, dependent))
+
+    exception = _wait(scheduler)
+    assert isinstance(exception, ValueError)
+    assert ran == ["independent"]
+    for future in (dependent, chained, joined):
+        assert future.exception() is failed.exception()
+
+
+def test_nested_schedule():
+    """Nodes scheduled by other nodes are waited"""
+    scheduler = _Scheduler()
+    schedule = scheduler.schedule
+    ran = []
+
+    def parent():
+        """Schedule a child node"""
+        ran.append("parent")
+        schedule(ran.append, "child", pool="disk")
+
+    first = schedule(parent)
+    schedule(ran.append, "after", after=(first,))
+
+    assert _wait(scheduler) is None
+    assert sorted(ran) == ["after", "child", "parent"]
+
+
+def test_priority(monkeypatch):
+    """Ready nodes run by decreasing priority, without exceeding the workers"""
+    monkeypatch.setitem(WORKERS, "test", 1)
+    scheduler = _Scheduler()
+    schedule = scheduler.schedule
+    ran = []
+
+    # Occupy the only worker until all nodes are scheduled
+    started = Event()
+    release = Event()
+
+    def block():
+        """Block the worker"""
+        started.set()
+        release.wait(_TIMEOUT)
+
+    schedule(block, pool="test")
+    assert started.wait(_TIMEOUT)
+    for name, priority in (("low", 1), ("high", 3), ("medium", 2), ("same", 1)):
+        schedule(ran.append, name, pool="test", priority=priority)
+    release.set()
+
+    assert _wait(scheduler) is None
+    assert ran == ["high", "medium", "low", "same"]
+
+
+@pytest.mark.parametrize("pool", ("net", "disk", "cpu"))
+def test_chained_nodes(pool):
+    """Chained nodes run in order in all pools"""
+    scheduler = _Scheduler()
+    schedule = scheduler.schedule
+    results = []
+
+    previous = ()
+    for index in range(WORKERS[pool] * 8):
+        previous = (schedule(results.append, index, after=previous, pool=pool),)
+
+    assert _wait(scheduler) is None
+    assert results == list(range(WORKERS[pool] * 8))